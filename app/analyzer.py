@@ -4,6 +4,7 @@ Thresholds are loaded from thresholds.json (Vodafone VFKD guidelines).
 The file supports per-modulation thresholds for DS power, US power, and SNR.
 """
 
+import functools
 import json
 import logging
 import os
@@ -25,8 +26,13 @@ def _load_thresholds():
     except (FileNotFoundError, json.JSONDecodeError) as e:
         log.warning("Could not load thresholds.json (%s), using defaults", e)
         _thresholds = {}
+    for fn in (_get_ds_power_thresholds, _get_us_power_thresholds, _get_snr_thresholds):
+        fn.cache_clear()
 
 
+# Threshold getters are memoized per argument (a handful of modulations and
+# DOCSIS versions) and return shared dicts that callers must not modify.
+@functools.lru_cache(maxsize=32)
 def _get_ds_power_thresholds(modulation=None):
     """Get DS power thresholds for a given modulation."""
     ds = _thresholds.get("downstream_power", {})
@@ -41,6 +47,7 @@ def _get_ds_power_thresholds(modulation=None):
     }
 
 
+@functools.lru_cache(maxsize=32)
 def _get_us_power_thresholds(docsis_version=None):
     """Get US power thresholds for a given DOCSIS version."""
     us = _thresholds.get("upstream_power", {})
@@ -60,6 +67,7 @@ def _get_us_power_thresholds(docsis_version=None):
     }
 
 
+@functools.lru_cache(maxsize=32)
 def _get_snr_thresholds(modulation=None):
     """Get SNR thresholds for a given modulation."""
     snr = _thresholds.get("snr", {})
@@ -103,11 +111,11 @@ def _health_detail(issues):
     return " + ".join(issues)
 
 
-def _assess_ds_channel(ch, docsis_ver):
-    """Assess a single downstream channel. Returns (health, health_detail)."""
+def _assess_ds_channel(power, snr, modulation):
+    """Assess a single downstream channel from parsed values.
+    Returns (health, health_detail)."""
     issues = []
-    power = _parse_float(ch.get("powerLevel"))
-    modulation = (ch.get("modulation") or ch.get("type") or "").upper().replace("-", "")
+    modulation = (modulation or "").upper().replace("-", "")
 
     pt = _get_ds_power_thresholds(modulation)
     if power < pt["crit_min"] or power > pt["crit_max"]:
@@ -115,26 +123,20 @@ def _assess_ds_channel(ch, docsis_ver):
     elif power < pt["good_min"] or power > pt["good_max"]:
         issues.append("power warning")
 
-    snr_val = None
-    if docsis_ver == "3.0" and ch.get("mse"):
-        snr_val = abs(_parse_float(ch["mse"]))
-    elif docsis_ver == "3.1" and ch.get("mer"):
-        snr_val = _parse_float(ch["mer"])
-
-    if snr_val is not None:
+    if snr is not None:
         st = _get_snr_thresholds(modulation)
-        if snr_val < st["crit_min"]:
+        if snr < st["crit_min"]:
             issues.append("snr critical")
-        elif snr_val < st["good_min"]:
+        elif snr < st["good_min"]:
             issues.append("snr warning")
 
     return _channel_health(issues), _health_detail(issues)
 
 
-def _assess_us_channel(ch, docsis_ver="3.0"):
-    """Assess a single upstream channel. Returns (health, health_detail)."""
+def _assess_us_channel(power, docsis_ver="3.0"):
+    """Assess a single upstream channel from its parsed power.
+    Returns (health, health_detail)."""
     issues = []
-    power = _parse_float(ch.get("powerLevel"))
 
     pt = _get_us_power_thresholds(docsis_ver)
     if power < pt["crit_min"] or power > pt["crit_max"]:
@@ -145,6 +147,45 @@ def _assess_us_channel(ch, docsis_ver="3.0"):
     return _channel_health(issues), _health_detail(issues)
 
 
+def _parse_ds_channel(ch, docsis_ver):
+    """Build a downstream channel dict. Each raw field is parsed once."""
+    power = _parse_float(ch.get("powerLevel"))
+    if docsis_ver == "3.0":
+        snr = abs(_parse_float(ch["mse"])) if ch.get("mse") else None
+    else:
+        snr = _parse_float(ch["mer"]) if ch.get("mer") else None
+    modulation = ch.get("modulation") or ch.get("type", "")
+    health, health_detail = _assess_ds_channel(power, snr, modulation)
+    return {
+        "channel_id": ch.get("channelID", 0),
+        "frequency": ch.get("frequency", ""),
+        "power": power,
+        "modulation": modulation,
+        "snr": snr,
+        "correctable_errors": ch.get("corrErrors", 0),
+        "uncorrectable_errors": ch.get("nonCorrErrors", 0),
+        "docsis_version": docsis_ver,
+        "health": health,
+        "health_detail": health_detail,
+    }
+
+
+def _parse_us_channel(ch, docsis_ver):
+    """Build an upstream channel dict. Each raw field is parsed once."""
+    power = _parse_float(ch.get("powerLevel"))
+    health, health_detail = _assess_us_channel(power, docsis_ver)
+    return {
+        "channel_id": ch.get("channelID", 0),
+        "frequency": ch.get("frequency", ""),
+        "power": power,
+        "modulation": ch.get("modulation") or ch.get("type", ""),
+        "multiplex": ch.get("multiplex", ""),
+        "docsis_version": docsis_ver,
+        "health": health,
+        "health_detail": health_detail,
+    }
+
+
 def analyze(data: dict) -> dict:
     """Analyze DOCSIS data and return structured result.
 
@@ -162,69 +203,13 @@ def analyze(data: dict) -> dict:
     us30 = us.get("docsis30", [])
 
     # --- Parse downstream channels ---
-    ds_channels = []
-    for ch in ds30:
-        power = _parse_float(ch.get("powerLevel"))
-        snr = abs(_parse_float(ch.get("mse"))) if ch.get("mse") else None
-        health, health_detail = _assess_ds_channel(ch, "3.0")
-        ds_channels.append({
-            "channel_id": ch.get("channelID", 0),
-            "frequency": ch.get("frequency", ""),
-            "power": power,
-            "modulation": ch.get("modulation") or ch.get("type", ""),
-            "snr": snr,
-            "correctable_errors": ch.get("corrErrors", 0),
-            "uncorrectable_errors": ch.get("nonCorrErrors", 0),
-            "docsis_version": "3.0",
-            "health": health,
-            "health_detail": health_detail,
-        })
-    for ch in ds31:
-        power = _parse_float(ch.get("powerLevel"))
-        snr = _parse_float(ch.get("mer")) if ch.get("mer") else None
-        health, health_detail = _assess_ds_channel(ch, "3.1")
-        ds_channels.append({
-            "channel_id": ch.get("channelID", 0),
-            "frequency": ch.get("frequency", ""),
-            "power": power,
-            "modulation": ch.get("modulation") or ch.get("type", ""),
-            "snr": snr,
-            "correctable_errors": ch.get("corrErrors", 0),
-            "uncorrectable_errors": ch.get("nonCorrErrors", 0),
-            "docsis_version": "3.1",
-            "health": health,
-            "health_detail": health_detail,
-        })
-
+    ds_channels = [_parse_ds_channel(ch, "3.0") for ch in ds30]
+    ds_channels += [_parse_ds_channel(ch, "3.1") for ch in ds31]
     ds_channels.sort(key=lambda c: c["channel_id"])
 
     # --- Parse upstream channels ---
-    us_channels = []
-    for ch in us30:
-        health, health_detail = _assess_us_channel(ch, "3.0")
-        us_channels.append({
-            "channel_id": ch.get("channelID", 0),
-            "frequency": ch.get("frequency", ""),
-            "power": _parse_float(ch.get("powerLevel")),
-            "modulation": ch.get("modulation") or ch.get("type", ""),
-            "multiplex": ch.get("multiplex", ""),
-            "docsis_version": "3.0",
-            "health": health,
-            "health_detail": health_detail,
-        })
-    for ch in us31:
-        health, health_detail = _assess_us_channel(ch, "3.1")
-        us_channels.append({
-            "channel_id": ch.get("channelID", 0),
-            "frequency": ch.get("frequency", ""),
-            "power": _parse_float(ch.get("powerLevel")),
-            "modulation": ch.get("modulation") or ch.get("type", ""),
-            "multiplex": ch.get("multiplex", ""),
-            "docsis_version": "3.1",
-            "health": health,
-            "health_detail": health_detail,
-        })
-
+    us_channels = [_parse_us_channel(ch, "3.0") for ch in us30]
+    us_channels += [_parse_us_channel(ch, "3.1") for ch in us31]
     us_channels.sort(key=lambda c: c["channel_id"])
 
     # --- Summary metrics ---
@@ -235,16 +220,21 @@ def analyze(data: dict) -> dict:
     total_corr = sum(c["correctable_errors"] for c in ds_channels)
     total_uncorr = sum(c["uncorrectable_errors"] for c in ds_channels)
 
+    # Each extreme is computed once and shared by the summary and health checks
+    ds_pmin, ds_pmax = (min(ds_powers), max(ds_powers)) if ds_powers else (0, 0)
+    us_pmin, us_pmax = (min(us_powers), max(us_powers)) if us_powers else (0, 0)
+    snr_min = min(ds_snrs) if ds_snrs else 0
+
     summary = {
         "ds_total": len(ds_channels),
         "us_total": len(us_channels),
-        "ds_power_min": round(min(ds_powers), 1) if ds_powers else 0,
-        "ds_power_max": round(max(ds_powers), 1) if ds_powers else 0,
+        "ds_power_min": round(ds_pmin, 1),
+        "ds_power_max": round(ds_pmax, 1),
         "ds_power_avg": round(sum(ds_powers) / len(ds_powers), 1) if ds_powers else 0,
-        "us_power_min": round(min(us_powers), 1) if us_powers else 0,
-        "us_power_max": round(max(us_powers), 1) if us_powers else 0,
+        "us_power_min": round(us_pmin, 1),
+        "us_power_max": round(us_pmax, 1),
         "us_power_avg": round(sum(us_powers) / len(us_powers), 1) if us_powers else 0,
-        "ds_snr_min": round(min(ds_snrs), 1) if ds_snrs else 0,
+        "ds_snr_min": round(snr_min, 1),
         "ds_snr_avg": round(sum(ds_snrs) / len(ds_snrs), 1) if ds_snrs else 0,
         "ds_correctable_errors": total_corr,
         "ds_uncorrectable_errors": total_uncorr,
@@ -257,17 +247,17 @@ def analyze(data: dict) -> dict:
     us_pt = _get_us_power_thresholds()
     snr_t = _get_snr_thresholds()
 
-    if ds_powers and (min(ds_powers) < ds_pt["crit_min"] or max(ds_powers) > ds_pt["crit_max"]):
+    if ds_powers and (ds_pmin < ds_pt["crit_min"] or ds_pmax > ds_pt["crit_max"]):
         issues.append("ds_power_critical")
-    elif ds_powers and (min(ds_powers) < ds_pt["good_min"] or max(ds_powers) > ds_pt["good_max"]):
+    elif ds_powers and (ds_pmin < ds_pt["good_min"] or ds_pmax > ds_pt["good_max"]):
         issues.append("ds_power_warn")
-    if us_powers and (min(us_powers) < us_pt["crit_min"] or max(us_powers) > us_pt["crit_max"]):
+    if us_powers and (us_pmin < us_pt["crit_min"] or us_pmax > us_pt["crit_max"]):
         issues.append("us_power_critical")
-    elif us_powers and (min(us_powers) < us_pt["good_min"] or max(us_powers) > us_pt["good_max"]):
+    elif us_powers and (us_pmin < us_pt["good_min"] or us_pmax > us_pt["good_max"]):
         issues.append("us_power_warn")
-    if ds_snrs and min(ds_snrs) < snr_t["crit_min"]:
+    if ds_snrs and snr_min < snr_t["crit_min"]:
         issues.append("snr_critical")
-    elif ds_snrs and min(ds_snrs) < snr_t["good_min"]:
+    elif ds_snrs and snr_min < snr_t["good_min"]:
         issues.append("snr_warn")
     if total_uncorr > _get_uncorr_threshold():
         issues.append("uncorr_errors_high")
@@ -1,5 +1,6 @@
 """Configuration management with persistent config.json + env var overrides."""
 
+import contextlib
 import json
 import logging
 import os
@@ -86,6 +87,7 @@ class ConfigManager:
         self.config_path = os.path.join(data_dir, "config.json")
         self._key_path = os.path.join(data_dir, ".config_key")
         self._file_config = {}
+        self._batch_depth = 0
         self._fernet = self._init_fernet()
         self._load()
 
@@ -123,33 +125,43 @@ class ConfigManager:
             return value
 
     def _load(self):
-        """Load config.json if it exists. Migrates legacy fritz_* keys to modem_*."""
+        """Load config.json if it exists. Migrates legacy fritz_* keys to modem_*.
+
+        The file is parsed into a local dict and swapped in with one
+        assignment, so concurrent get() calls never see a partial config.
+        """
+        file_config = {}
         if os.path.exists(self.config_path):
             try:
                 with open(self.config_path, "r") as f:
-                    self._file_config = json.load(f)
+                    file_config = json.load(f)
                 log.info("Loaded config from %s", self.config_path)
-                self._migrate_legacy_keys()
+                self._migrate_legacy_keys(file_config)
             except Exception as e:
                 log.warning("Failed to load config.json: %s", e)
-                self._file_config = {}
+                file_config = {}
         else:
             log.info("No config.json found, using defaults/env")
+        self._file_config = file_config
+
+    def reload(self):
+        """Re-read config.json from disk, replacing the in-memory values."""
+        self._load()
 
-    def _migrate_legacy_keys(self):
+    def _migrate_legacy_keys(self, file_config):
         """Migrate fritz_* config keys to modem_* (backwards compatibility)."""
         migrated = False
         for old_key, new_key in _LEGACY_KEY_MAP.items():
-            if old_key in self._file_config and new_key not in self._file_config:
-                self._file_config[new_key] = self._file_config.pop(old_key)
+            if old_key in file_config and new_key not in file_config:
+                file_config[new_key] = file_config.pop(old_key)
                 migrated = True
-            elif old_key in self._file_config:
-                del self._file_config[old_key]
+            elif old_key in file_config:
+                del file_config[old_key]
                 migrated = True
         if migrated:
             try:
                 with open(self.config_path, "w") as f:
-                    json.dump(self._file_config, f, indent=2)
+                    json.dump(file_config, f, indent=2)
                 log.info("Migrated legacy fritz_* keys to modem_*")
             except Exception as e:
                 log.warning("Failed to save migrated config: %s", e)
@@ -222,6 +234,22 @@ class ConfigManager:
                 except (ValueError, TypeError):
                     pass
 
+        if not self._batch_depth:
+            self._write()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Coalesce save() calls inside the block into a single write on exit."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._write()
+
+    def _write(self):
+        """Write the in-memory file config to config.json (owner-only)."""
         with open(self.config_path, "w") as f:
             json.dump(self._file_config, f, indent=2)
         try:
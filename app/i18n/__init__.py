@@ -20,7 +20,9 @@ for _fname in sorted(os.listdir(_DIR)):
     LANGUAGES[_code] = _meta.get("language_name", _code)
     LANG_FLAGS[_code] = _meta.get("flag", "")
 
+_FALLBACK = _TRANSLATIONS.get("en", {})
+
 
 def get_translations(lang="en"):
-    """Return translation dict for given language code."""
-    return _TRANSLATIONS.get(lang, _TRANSLATIONS.get("en", {}))
+    """Return translation dict for given language code (cached at import)."""
+    return _TRANSLATIONS.get(lang, _FALLBACK)
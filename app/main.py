@@ -196,8 +196,7 @@ def main():
     def on_config_changed():
         """Called when config is saved via web UI."""
         log.info("Configuration changed, restarting polling loop")
-        # Reload config from file
-        config_mgr._load()
+        config_mgr.reload()
         # Update storage max_days
         storage.max_days = config_mgr.get("history_days", 7)
         if config_mgr.is_configured():
@@ -6,6 +6,8 @@ import os
 import sqlite3
 from datetime import datetime, timedelta
 
+import orjson
+
 ALLOWED_MIME_TYPES = {
     "image/png", "image/jpeg", "image/gif", "image/webp",
     "application/pdf", "text/plain",
@@ -22,11 +24,36 @@ class SnapshotStorage:
     def __init__(self, db_path, max_days=7):
         self.db_path = db_path
         self.max_days = max_days
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # Serialized snapshot listings, dropped whenever snapshots are added/removed
+        self._list_cache = {}
+        self._list_gen = 0
+        # "file:" URIs (e.g. file:name?mode=memory&cache=shared) are passed to
+        # sqlite as-is; an in-memory database lives only while a connection
+        # to it is open, so hold one for the lifetime of this object.
+        self._uri = db_path.startswith("file:")
+        self._keepalive = None
+        if self._uri:
+            self._keepalive = sqlite3.connect(db_path, uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self._init_db()
 
+    def _invalidate_list_cache(self):
+        self._list_gen += 1
+        self._list_cache.clear()
+
+    def _cached_json(self, name, loader):
+        """Return orjson bytes for loader(), cached until the next snapshot write."""
+        data = self._list_cache.get(name)
+        if data is None:
+            gen = self._list_gen
+            data = orjson.dumps(loader())
+            if gen == self._list_gen:
+                self._list_cache[name] = data
+        return data
+
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS snapshots (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -106,7 +133,7 @@ class SnapshotStorage:
         """Save current analysis as a snapshot. Runs cleanup afterwards."""
         ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with sqlite3.connect(self.db_path, uri=self._uri) as conn:
                 conn.execute(
                     "INSERT INTO snapshots (timestamp, summary_json, ds_channels_json, us_channels_json) VALUES (?, ?, ?, ?)",
                     (
@@ -120,19 +147,24 @@ class SnapshotStorage:
         except Exception as e:
             log.error("Failed to save snapshot: %s", e)
             return
+        self._invalidate_list_cache()
         self._cleanup()
 
     def get_snapshot_list(self):
         """Return list of available snapshot timestamps (newest first)."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             rows = conn.execute(
                 "SELECT timestamp FROM snapshots ORDER BY timestamp DESC"
             ).fetchall()
         return [r[0] for r in rows]
 
+    def get_snapshot_list_json(self):
+        """get_snapshot_list() as cached JSON bytes."""
+        return self._cached_json("snapshots", self.get_snapshot_list)
+
     def get_snapshot(self, timestamp):
         """Load a single snapshot by timestamp. Returns analysis dict or None."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             row = conn.execute(
                 "SELECT summary_json, ds_channels_json, us_channels_json FROM snapshots WHERE timestamp = ?",
                 (timestamp,),
@@ -147,16 +179,20 @@ class SnapshotStorage:
 
     def get_dates_with_data(self):
         """Return list of dates (YYYY-MM-DD) that have at least one snapshot."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             rows = conn.execute(
                 "SELECT DISTINCT substr(timestamp, 1, 10) as day FROM snapshots ORDER BY day"
             ).fetchall()
         return [r[0] for r in rows]
 
+    def get_dates_with_data_json(self):
+        """get_dates_with_data() as cached JSON bytes."""
+        return self._cached_json("dates", self.get_dates_with_data)
+
     def get_daily_snapshot(self, date, target_time="06:00"):
         """Get the snapshot closest to target_time on the given date."""
         target_ts = f"{date}T{target_time}:00"
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             row = conn.execute(
                 """SELECT timestamp, summary_json, ds_channels_json, us_channels_json
                    FROM snapshots
@@ -178,7 +214,7 @@ class SnapshotStorage:
         """Get summary data points for a date range, one per day (closest to target_time).
         Returns list of {date, timestamp, ...summary_fields}."""
         dates = []
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             rows = conn.execute(
                 "SELECT DISTINCT substr(timestamp, 1, 10) as day FROM snapshots WHERE day >= ? AND day <= ? ORDER BY day",
                 (start_date, end_date),
@@ -196,7 +232,7 @@ class SnapshotStorage:
 
     def get_range_data(self, start_ts, end_ts):
         """Get all snapshots between two ISO timestamps (inclusive)."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             rows = conn.execute(
                 "SELECT timestamp, summary_json, ds_channels_json, us_channels_json "
                 "FROM snapshots WHERE timestamp >= ? AND timestamp <= ? ORDER BY timestamp",
@@ -215,24 +251,30 @@ class SnapshotStorage:
 
     def get_intraday_data(self, date):
         """Get all snapshots for a single day (for day-detail trends)."""
-        with sqlite3.connect(self.db_path) as conn:
-            rows = conn.execute(
+        return list(self.iter_intraday_data(date))
+
+    def iter_intraday_data(self, date):
+        """Yield snapshot summaries for a single day, one row at a time.
+        The connection stays open until the generator is exhausted or closed."""
+        conn = sqlite3.connect(self.db_path, uri=self._uri)
+        try:
+            cursor = conn.execute(
                 "SELECT timestamp, summary_json FROM snapshots WHERE timestamp LIKE ? ORDER BY timestamp",
                 (f"{date}%",),
-            ).fetchall()
-        results = []
-        for row in rows:
-            entry = {"timestamp": row[0]}
-            entry.update(json.loads(row[1]))
-            results.append(entry)
-        return results
+            )
+            for row in cursor:
+                entry = {"timestamp": row[0]}
+                entry.update(json.loads(row[1]))
+                yield entry
+        finally:
+            conn.close()
 
     def save_bqm_graph(self, image_data):
         """Save BQM graph for today. Skips if already exists (UNIQUE date)."""
         today = datetime.now().strftime("%Y-%m-%d")
         ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with sqlite3.connect(self.db_path, uri=self._uri) as conn:
                 conn.execute(
                     "INSERT OR IGNORE INTO bqm_graphs (date, timestamp, image_blob) VALUES (?, ?, ?)",
                     (today, ts, image_data),
@@ -243,7 +285,7 @@ class SnapshotStorage:
 
     def get_bqm_dates(self):
         """Return list of dates with BQM graphs (newest first)."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             rows = conn.execute(
                 "SELECT date FROM bqm_graphs ORDER BY date DESC"
             ).fetchall()
@@ -251,7 +293,7 @@ class SnapshotStorage:
 
     def get_bqm_graph(self, date):
         """Return BQM graph PNG bytes for a date, or None."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             row = conn.execute(
                 "SELECT image_blob FROM bqm_graphs WHERE date = ?", (date,)
             ).fetchone()
@@ -268,7 +310,7 @@ class SnapshotStorage:
         ts_expr = "datetime(?, 'localtime')" if timestamp.endswith("Z") else "datetime(?)"
         # Strip Z for the parameter since SQLite datetime() handles it
         ts_param = timestamp
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             row = conn.execute(
                 f"""SELECT timestamp, summary_json, ds_channels_json, us_channels_json
                    FROM snapshots
@@ -293,7 +335,7 @@ class SnapshotStorage:
         if not results:
             return
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with sqlite3.connect(self.db_path, uri=self._uri) as conn:
                 conn.executemany(
                     "INSERT OR IGNORE INTO speedtest_results "
                     "(id, timestamp, download_mbps, upload_mbps, download_human, "
@@ -314,7 +356,7 @@ class SnapshotStorage:
 
     def get_speedtest_results(self, limit=2000):
         """Return cached speedtest results, newest first."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             conn.row_factory = sqlite3.Row
             rows = conn.execute(
                 "SELECT id, timestamp, download_mbps, upload_mbps, download_human, "
@@ -326,7 +368,7 @@ class SnapshotStorage:
 
     def get_speedtest_by_id(self, result_id):
         """Return a single speedtest result by id, or None."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             conn.row_factory = sqlite3.Row
             row = conn.execute(
                 "SELECT id, timestamp, download_mbps, upload_mbps, download_human, "
@@ -338,13 +380,13 @@ class SnapshotStorage:
 
     def get_speedtest_count(self):
         """Return number of cached speedtest results."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             row = conn.execute("SELECT COUNT(*) FROM speedtest_results").fetchone()
         return row[0] if row else 0
 
     def get_latest_speedtest_id(self):
         """Return the highest speedtest result id, or 0 if none."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             row = conn.execute(
                 "SELECT MAX(id) FROM speedtest_results"
             ).fetchone()
@@ -354,7 +396,7 @@ class SnapshotStorage:
 
     def _connect(self):
         """Return a connection with foreign keys enabled."""
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path, uri=self._uri)
         conn.execute("PRAGMA foreign_keys = ON")
         return conn
 
@@ -464,7 +506,7 @@ class SnapshotStorage:
 
     def save_event(self, timestamp, severity, event_type, message, details=None):
         """Save a single event. Returns the new event id."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             cur = conn.execute(
                 "INSERT INTO events (timestamp, severity, event_type, message, details) "
                 "VALUES (?, ?, ?, ?, ?)",
@@ -477,7 +519,7 @@ class SnapshotStorage:
         """Bulk insert events. Returns count of inserted rows."""
         if not events_list:
             return 0
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             conn.executemany(
                 "INSERT INTO events (timestamp, severity, event_type, message, details) "
                 "VALUES (?, ?, ?, ?, ?)",
@@ -507,7 +549,7 @@ class SnapshotStorage:
             query += " WHERE " + " AND ".join(conditions)
         query += " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             conn.row_factory = sqlite3.Row
             rows = conn.execute(query, params).fetchall()
         results = []
@@ -524,19 +566,19 @@ class SnapshotStorage:
     def get_event_count(self, acknowledged=None):
         """Return event count, optionally filtered by acknowledged status."""
         if acknowledged is not None:
-            with sqlite3.connect(self.db_path) as conn:
+            with sqlite3.connect(self.db_path, uri=self._uri) as conn:
                 row = conn.execute(
                     "SELECT COUNT(*) FROM events WHERE acknowledged = ?",
                     (int(acknowledged),),
                 ).fetchone()
         else:
-            with sqlite3.connect(self.db_path) as conn:
+            with sqlite3.connect(self.db_path, uri=self._uri) as conn:
                 row = conn.execute("SELECT COUNT(*) FROM events").fetchone()
         return row[0] if row else 0
 
     def acknowledge_event(self, event_id):
         """Acknowledge a single event. Returns True if found."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             rowcount = conn.execute(
                 "UPDATE events SET acknowledged = 1 WHERE id = ?", (event_id,)
             ).rowcount
@@ -544,7 +586,7 @@ class SnapshotStorage:
 
     def acknowledge_all_events(self):
         """Acknowledge all unacknowledged events. Returns rows affected."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             rowcount = conn.execute(
                 "UPDATE events SET acknowledged = 1 WHERE acknowledged = 0"
             ).rowcount
@@ -555,7 +597,7 @@ class SnapshotStorage:
         if days <= 0:
             return 0
         cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S")
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             deleted = conn.execute(
                 "DELETE FROM events WHERE timestamp < ?", (cutoff,)
             ).rowcount
@@ -569,7 +611,7 @@ class SnapshotStorage:
         channel_id = int(channel_id)
         col = "ds_channels_json" if direction == "ds" else "us_channels_json"
         cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S")
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             rows = conn.execute(
                 f"SELECT timestamp, {col} FROM snapshots WHERE timestamp >= ? ORDER BY timestamp",
                 (cutoff,),
@@ -593,7 +635,7 @@ class SnapshotStorage:
 
     def get_current_channels(self):
         """Return DS and US channels from the latest snapshot."""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             row = conn.execute(
                 "SELECT ds_channels_json, us_channels_json FROM snapshots ORDER BY timestamp DESC LIMIT 1"
             ).fetchone()
@@ -611,14 +653,15 @@ class SnapshotStorage:
         cutoff = (datetime.now() - timedelta(days=self.max_days)).strftime(
             "%Y-%m-%dT%H:%M:%S"
         )
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             deleted = conn.execute(
                 "DELETE FROM snapshots WHERE timestamp < ?", (cutoff,)
             ).rowcount
         if deleted:
+            self._invalidate_list_cache()
             log.info("Cleaned up %d old snapshots (before %s)", deleted, cutoff)
         cutoff_date = (datetime.now() - timedelta(days=self.max_days)).strftime("%Y-%m-%d")
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.db_path, uri=self._uri) as conn:
             bqm_deleted = conn.execute(
                 "DELETE FROM bqm_graphs WHERE date < ?", (cutoff_date,)
             ).rowcount
@@ -1,6 +1,8 @@
 """Flask web UI for DOCSight – DOCSIS channel monitoring."""
 
+import collections
 import functools
+import hashlib
 import json
 import logging
 import math
@@ -8,10 +10,20 @@ import os
 import re
 import stat
 import subprocess
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
 
-from flask import Flask, render_template, request, jsonify, redirect, session, url_for, make_response, send_file
+import orjson
+from flask import Flask, g, render_template, request, jsonify, redirect, session, url_for, make_response, send_file, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from flask.sessions import SecureCookieSessionInterface
+from itsdangerous import BadSignature
+from flask_compress import Compress
+from jinja2 import FileSystemBytecodeCache
 from werkzeug.security import check_password_hash
 
 from io import BytesIO
@@ -61,21 +73,129 @@ def _load_changelog():
         return []
 
 _changelog = _load_changelog()
+# Changelog is static at runtime: serialize once, serve with an ETag
+_CHANGELOG_JSON = orjson.dumps(_changelog)
+_CHANGELOG_ETAG = hashlib.md5(_CHANGELOG_JSON, usedforsecurity=False).hexdigest()
+
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (C-level encode/decode)."""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+class CachedSerializerSessionInterface(SecureCookieSessionInterface):
+    """Cookie sessions that build the signing serializer once per secret key
+    instead of on every request's open_session/save_session.
+
+    Cookies that passed signature verification are remembered in a small LRU
+    (cookie value -> payload, signing time), so repeat requests skip the HMAC
+    check. A hit is still subject to the session max_age.
+    """
+
+    VERIFIED_MAX = 256
+
+    def __init__(self):
+        self._cached = (None, None)
+        self._verified = collections.OrderedDict()
+        self._verified_lock = threading.Lock()
+
+    def get_signing_serializer(self, app):
+        key, serializer = self._cached
+        if serializer is None or key != app.secret_key:
+            serializer = super().get_signing_serializer(app)
+            self._cached = (app.secret_key, serializer)
+            with self._verified_lock:
+                self._verified.clear()
+        return serializer
+
+    def open_session(self, app, request):
+        serializer = self.get_signing_serializer(app)
+        if serializer is None:
+            return None
+        val = request.cookies.get(self.get_cookie_name(app))
+        if not val:
+            return self.session_class()
+        max_age = int(app.permanent_session_lifetime.total_seconds())
+        with self._verified_lock:
+            hit = self._verified.get(val)
+            if hit is not None:
+                self._verified.move_to_end(val)
+        if hit is not None and time.time() - hit[1] <= max_age:
+            return self.session_class(hit[0])
+        try:
+            data, signed_at = serializer.loads(val, max_age=max_age, return_timestamp=True)
+        except BadSignature:
+            return self.session_class()
+        with self._verified_lock:
+            self._verified[val] = (data, signed_at.timestamp())
+            if len(self._verified) > self.VERIFIED_MAX:
+                self._verified.popitem(last=False)
+        return self.session_class(data)
+
 
 app = Flask(__name__, template_folder="templates")
+app.json = OrjsonProvider(app)
+app.session_interface = CachedSerializerSessionInterface()
+_REPORT_TPL = app.jinja_env.get_template("report.md.j2")
 app.secret_key = os.urandom(32)  # overwritten by _init_session_key
+app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
+
+# Compress JSON API responses and rendered pages (brotli preferred, gzip fallback).
+# PDFs are left alone: fpdf2 already deflates their content streams.
+app.config.update(
+    COMPRESS_MIMETYPES=["application/json", "text/html"],
+    COMPRESS_ALGORITHM=["br", "gzip"],
+    COMPRESS_ALGORITHM_STREAMING=["br", "deflate"],
+    COMPRESS_MIN_SIZE=1024,
+    COMPRESS_LEVEL=4,
+    COMPRESS_BR_LEVEL=4,
+)
+Compress(app)
+
+# \A...\Z and re.ASCII: no trailing newline (as $ allows) and no non-ASCII digits
+_DATE_RE = re.compile(r"\A\d{4}-\d{2}-\d{2}\Z", re.ASCII)
+_TS_RE = re.compile(r"\A\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\Z", re.ASCII)
+
+
+def _is_valid_date(s):
+    """Return True if s is shaped like YYYY-MM-DD."""
+    return _DATE_RE.match(s) is not None
+
+
+def _is_valid_ts(s):
+    """Return True if s is shaped like YYYY-MM-DDTHH:MM:SS."""
+    return _TS_RE.match(s) is not None
 
-_TS_RE = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}$")
-_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+# Upper bounds for paginated queries (protects storage from unbounded reads)
+MAX_LIMIT = 1000
+MAX_OFFSET = 1_000_000
+
+
+# Error counters are mostly small; their strings are looked up, not formatted
+_SMALL_INTS = tuple(str(i) for i in range(1000))
 
 
 @app.template_filter("fmt_k")
 def format_k(value):
     """Format large numbers with k suffix: 132007 -> 132k, 5929 -> 5.9k."""
-    try:
-        value = int(value)
-    except (ValueError, TypeError):
-        return str(value)
+    if type(value) is not int:
+        try:
+            value = int(value)
+        except (ValueError, TypeError):
+            return str(value)
+    if 0 <= value < 1000:
+        return _SMALL_INTS[value]
     if value >= 100000:
         return f"{value // 1000}k"
     elif value >= 1000:
@@ -86,30 +206,84 @@ def format_k(value):
     return str(value)
 
 
+def _arg_int(name, default, lo, hi):
+    """Read an integer query param, falling back to default and clamping to [lo, hi]."""
+    v = request.args.get(name, default, type=int)
+    return lo if v < lo else hi if v > hi else v
+
+
+def _cfg(key, default=None):
+    """Read a config value, memoized for the rest of the request.
+
+    ConfigManager.get() checks env vars and may decrypt secrets on every call;
+    views and auth checks ask for the same keys several times per request.
+    """
+    if not _config_manager:
+        return default
+    memo = g.setdefault("cfg", {})
+    k = (key, default)
+    if k not in memo:
+        memo[k] = _config_manager.get(key, default)
+    return memo[k]
+
+
+def _iter_json_array(rows):
+    """Encode an iterable of rows as a streamed JSON array.
+
+    Rows go through app.json, so the output matches jsonify() of the list.
+    """
+    dumps = app.json.dumps
+    yield "["
+    sep = ""
+    for row in rows:
+        yield sep + dumps(row)
+        sep = ","
+    yield "]"
+
+
 def _get_lang():
-    """Get language from query param or config."""
-    lang = request.args.get("lang")
-    if lang and lang in LANGUAGES:
-        return lang
-    if _config_manager:
-        return _config_manager.get("language", "en")
-    return "en"
-
-# Shared state (updated from main loop)
-_state = {
-    "analysis": None,
-    "last_update": None,
-    "poll_interval": 900,
-    "error": None,
-    "connection_info": None,
-    "device_info": None,
-    "speedtest_latest": None,
-}
+    """Get language from query param or config (memoized per request)."""
+    lang = g.get("lang")
+    if lang is None:
+        lang = request.args.get("lang")
+        if not (lang and lang in LANGUAGES):
+            lang = _cfg("language", "en")
+        g.lang = lang
+    return lang
+
+
+def _get_theme():
+    """Get the configured UI theme (memoized per request)."""
+    theme = g.get("theme")
+    if theme is None:
+        theme = g.theme = _config_manager.get_theme() if _config_manager else "dark"
+    return theme
+
+@dataclass(frozen=True, slots=True)
+class State:
+    """Snapshot of the shared web state.
+
+    Instances are never mutated: update_state() swaps in a new object, so a
+    request that binds ``state = _state`` once sees a consistent view.
+    """
+    analysis: dict | None = None
+    last_update: str | None = None
+    poll_interval: int = 900
+    error: str | None = None
+    connection_info: dict | None = None
+    device_info: dict | None = None
+    speedtest_latest: dict | None = None
+
+
+# Shared state (replaced by the main loop via update_state)
+_state = State()
+_state_lock = threading.Lock()
 
 _storage = None
 _config_manager = None
 _on_config_changed = None
 _last_manual_poll = 0.0
+_auth_enabled = False  # admin_password set; refreshed by _refresh_auth_enabled()
 
 
 def init_storage(storage):
@@ -136,22 +310,37 @@ def _init_session_key(data_dir):
         app.secret_key = key
 
 
+def _init_template_cache(data_dir):
+    """Persist compiled template bytecode under the data directory."""
+    cache_dir = os.path.join(data_dir, ".jinja_cache")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError as e:
+        log.warning("Template cache disabled: %s", e)
+        return
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+
 def init_config(config_manager, on_config_changed=None):
     """Set the config manager and optional change callback."""
     global _config_manager, _on_config_changed
     _config_manager = config_manager
     _on_config_changed = on_config_changed
     _init_session_key(config_manager.data_dir)
+    _init_template_cache(config_manager.data_dir)
+    _refresh_auth_enabled()
+    _invalidate_export_cache()
+
+
+def _refresh_auth_enabled():
+    """Recompute whether an admin password is configured."""
+    global _auth_enabled
+    _auth_enabled = bool(_config_manager and _config_manager.get("admin_password", ""))
 
 
 def _auth_required():
     """Check if auth is enabled and user is not logged in."""
-    if not _config_manager:
-        return False
-    admin_pw = _config_manager.get("admin_password", "")
-    if not admin_pw:
-        return False
-    return not session.get("authenticated")
+    return _auth_enabled and not session.get("authenticated")
 
 
 def require_auth(f):
@@ -166,15 +355,15 @@ def require_auth(f):
 
 @app.route("/login", methods=["GET", "POST"])
 def login():
-    if not _config_manager or not _config_manager.get("admin_password", ""):
+    if not _auth_enabled:
         return redirect("/")
     lang = _get_lang()
     t = get_translations(lang)
-    theme = _config_manager.get_theme() if _config_manager else "dark"
+    theme = _get_theme()
     error = None
     if request.method == "POST":
         pw = request.form.get("password", "")
-        stored = _config_manager.get("admin_password", "")
+        stored = _cfg("admin_password", "")
         if stored.startswith(("scrypt:", "pbkdf2:")):
             success = check_password_hash(stored, pw)
         else:
@@ -195,26 +384,61 @@ def logout():
 @app.context_processor
 def inject_auth():
     """Make auth_enabled available in all templates."""
-    auth_enabled = bool(_config_manager and _config_manager.get("admin_password", ""))
-    return {"auth_enabled": auth_enabled, "version": APP_VERSION}
+    return {"auth_enabled": _auth_enabled, "version": APP_VERSION}
+
+
+# Serialized /api/export payload as a (state, payload) pair. It is built when
+# update_state() swaps in new data and is valid only for that State object.
+_export_cache = {"entry": None}
+
+
+def _invalidate_export_cache():
+    _export_cache["entry"] = None
+
+
+def _refresh_export_cache(state):
+    """Serialize the export report for state and cache it; returns the payload."""
+    payload = app.json.dumps({"text": _build_export_text(state)})
+    _export_cache["entry"] = (state, payload)
+    return payload
 
 
 def update_state(analysis=None, error=None, poll_interval=None, connection_info=None, device_info=None, speedtest_latest=None):
     """Update the shared web state from the main loop."""
+    global _state
+    changes = {}
     if analysis is not None:
-        _state["analysis"] = analysis
-        _state["last_update"] = time.strftime("%Y-%m-%d %H:%M:%S")
-        _state["error"] = None
+        changes["analysis"] = analysis
+        changes["last_update"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        changes["error"] = None
     if error is not None:
-        _state["error"] = str(error)
+        changes["error"] = str(error)
     if poll_interval is not None:
-        _state["poll_interval"] = poll_interval
+        changes["poll_interval"] = poll_interval
     if connection_info is not None:
-        _state["connection_info"] = connection_info
+        changes["connection_info"] = connection_info
     if device_info is not None:
-        _state["device_info"] = device_info
+        changes["device_info"] = device_info
     if speedtest_latest is not None:
-        _state["speedtest_latest"] = speedtest_latest
+        changes["speedtest_latest"] = speedtest_latest
+    if not changes:
+        return
+    with _state_lock:
+        prev = _state
+        _state = state = replace(prev, **changes)
+    if analysis is not None or connection_info is not None:
+        if not state.analysis:
+            return
+        try:
+            _refresh_export_cache(state)
+        except Exception as e:
+            log.warning("Failed to prerender export report: %s", e)
+            _invalidate_export_cache()
+    else:
+        # Report inputs unchanged: carry the cached payload over to the new state
+        entry = _export_cache["entry"]
+        if entry is not None and entry[0] is prev:
+            _export_cache["entry"] = (state, entry[1])
 
 
 @app.route("/")
@@ -223,18 +447,19 @@ def index():
     if _config_manager and not _config_manager.is_configured():
         return redirect("/setup")
 
-    theme = _config_manager.get_theme() if _config_manager else "dark"
+    theme = _get_theme()
     lang = _get_lang()
     t = get_translations(lang)
+    state = _state
 
-    isp_name = _config_manager.get("isp_name", "") if _config_manager else ""
+    isp_name = _cfg("isp_name", "")
     bqm_configured = _config_manager.is_bqm_configured() if _config_manager else False
     speedtest_configured = _config_manager.is_speedtest_configured() if _config_manager else False
-    speedtest_latest = _state.get("speedtest_latest")
-    booked_download = _config_manager.get("booked_download", 0) if _config_manager else 0
-    booked_upload = _config_manager.get("booked_upload", 0) if _config_manager else 0
-    conn_info = _state.get("connection_info") or {}
-    dev_info = _state.get("device_info") or {}
+    speedtest_latest = state.speedtest_latest
+    booked_download = _cfg("booked_download", 0)
+    booked_upload = _cfg("booked_upload", 0)
+    conn_info = state.connection_info or {}
+    dev_info = state.device_info or {}
 
     def _compute_uncorr_pct(analysis):
         """Compute log-scale percentage for uncorrectable errors gauge."""
@@ -253,7 +478,7 @@ def index():
         return False
 
     ts = request.args.get("t")
-    if ts and not _TS_RE.match(ts):
+    if ts and not _is_valid_ts(ts):
         return redirect("/")
     if ts and _storage:
         snapshot = _storage.get_snapshot(ts)
@@ -262,7 +487,7 @@ def index():
                 "index.html",
                 analysis=snapshot,
                 last_update=ts.replace("T", " "),
-                poll_interval=_state["poll_interval"],
+                poll_interval=state.poll_interval,
                 error=None,
                 historical=True,
                 snapshot_ts=ts,
@@ -281,10 +506,10 @@ def index():
             )
     return render_template(
         "index.html",
-        analysis=_state["analysis"],
-        last_update=_state["last_update"],
-        poll_interval=_state["poll_interval"],
-        error=_state["error"],
+        analysis=state.analysis,
+        last_update=state.last_update,
+        poll_interval=state.poll_interval,
+        error=state.error,
         historical=False,
         snapshot_ts=None,
         theme=theme,
@@ -294,8 +519,8 @@ def index():
         speedtest_latest=speedtest_latest,
         booked_download=booked_download,
         booked_upload=booked_upload,
-        uncorr_pct=_compute_uncorr_pct(_state["analysis"]),
-        has_us_ofdma=_has_us_ofdma(_state["analysis"]),
+        uncorr_pct=_compute_uncorr_pct(state.analysis),
+        has_us_ofdma=_has_us_ofdma(state.analysis),
         device_info=dev_info,
         t=t, lang=lang, languages=LANGUAGES, lang_flags=LANG_FLAGS,
         changelog=_changelog[0] if _changelog else None,
@@ -317,7 +542,7 @@ def setup():
 @require_auth
 def settings():
     config = _config_manager.get_all(mask_secrets=True) if _config_manager else {}
-    theme = _config_manager.get_theme() if _config_manager else "dark"
+    theme = _get_theme()
     lang = _get_lang()
     t = get_translations(lang)
     tz_name, tz_offset = _server_tz_info()
@@ -331,7 +556,7 @@ def api_config():
     if not _config_manager:
         return jsonify({"success": False, "error": "Config not initialized"}), 500
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
         if not data:
             return jsonify({"success": False, "error": "No data"}), 400
         # Clamp poll_interval to allowed range
@@ -342,6 +567,9 @@ def api_config():
             except (ValueError, TypeError):
                 pass
         _config_manager.save(data)
+        g.pop("cfg", None)
+        _refresh_auth_enabled()
+        _invalidate_export_cache()
         if _on_config_changed:
             _on_config_changed()
         return jsonify({"success": True})
@@ -356,7 +584,9 @@ def api_config():
 def api_test_modem():
     """Test modem connection."""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({"success": False, "error": "No data"})
         # Resolve masked passwords to real values
         password = data.get("modem_password", "")
         if password == PASSWORD_MASK and _config_manager:
@@ -378,7 +608,9 @@ def api_test_modem():
 def api_test_mqtt():
     """Test MQTT broker connection."""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({"success": False, "error": "No data"})
         # Resolve masked passwords to real values
         pw = data.get("mqtt_password", "") or None
         if pw == PASSWORD_MASK and _config_manager:
@@ -433,7 +665,7 @@ def api_poll():
 def api_calendar():
     """Return dates that have snapshot data."""
     if _storage:
-        return jsonify(_storage.get_dates_with_data())
+        return app.response_class(_storage.get_dates_with_data_json(), mimetype="application/json")
     return jsonify([])
 
 
@@ -444,9 +676,9 @@ def api_snapshot_daily():
     date = request.args.get("date")
     if not date or not _storage:
         return jsonify(None)
-    if not _DATE_RE.match(date):
+    if not _is_valid_date(date):
         return jsonify({"error": "Invalid date format"}), 400
-    target_time = _config_manager.get("snapshot_time", "06:00") if _config_manager else "06:00"
+    target_time = _cfg("snapshot_time", "06:00")
     snap = _storage.get_daily_snapshot(date, target_time)
     return jsonify(snap)
 
@@ -460,7 +692,7 @@ def api_trends():
         return jsonify([])
     range_type = request.args.get("range", "day")
     date_str = request.args.get("date", datetime.now().strftime("%Y-%m-%d"))
-    target_time = _config_manager.get("snapshot_time", "06:00") if _config_manager else "06:00"
+    target_time = _cfg("snapshot_time", "06:00")
 
     try:
         ref_date = datetime.strptime(date_str, "%Y-%m-%d")
@@ -468,8 +700,9 @@ def api_trends():
         return jsonify({"error": "Invalid date format"}), 400
 
     if range_type == "day":
-        # All snapshots for a single day (intraday)
-        return jsonify(_storage.get_intraday_data(date_str))
+        # All snapshots for a single day (intraday), streamed row by row
+        rows = _storage.iter_intraday_data(date_str)
+        return app.response_class(stream_with_context(_iter_json_array(rows)), mimetype="application/json")
     elif range_type == "week":
         start = (ref_date - timedelta(days=ref_date.weekday())).strftime("%Y-%m-%d")
         end = (ref_date + timedelta(days=6 - ref_date.weekday())).strftime("%Y-%m-%d")
@@ -489,87 +722,31 @@ def api_trends():
 @require_auth
 def api_export():
     """Generate a structured markdown report for LLM analysis."""
-    analysis = _state.get("analysis")
-    if not analysis:
+    state = _state
+    if not state.analysis:
         return jsonify({"error": "No data available"}), 404
 
-    s = analysis["summary"]
-    ds = analysis["ds_channels"]
-    us = analysis["us_channels"]
-    ts = _state.get("last_update", "unknown")
-
-    isp = _config_manager.get("isp_name", "") if _config_manager else ""
-    conn = _state.get("connection_info") or {}
-    ds_mbps = conn.get("max_downstream_kbps", 0) // 1000 if conn else 0
-    us_mbps = conn.get("max_upstream_kbps", 0) // 1000 if conn else 0
-
-    lines = [
-        "# DOCSight – DOCSIS Cable Connection Status Report",
-        "",
-        "## Context",
-        "This is a status report from a DOCSIS cable modem generated by DOCSight.",
-        "DOCSIS (Data Over Cable Service Interface Specification) is the standard for internet over coaxial cable.",
-        "Analyze this data and provide insights about connection health, problematic channels, and recommendations.",
-        "",
-        "## Overview",
-        f"- **ISP**: {isp}" if isp else None,
-        f"- **Tariff**: {ds_mbps}/{us_mbps} Mbit/s (Down/Up)" if ds_mbps else None,
-        f"- **Health**: {s.get('health', 'Unknown')}",
-        f"- **Issues**: {', '.join(s.get('health_issues', []))}" if s.get('health_issues') else None,
-        f"- **Timestamp**: {ts}",
-        "",
-        "## Summary",
-        "| Metric | Value |",
-        "|--------|-------|",
-        f"| Downstream Channels | {s.get('ds_total', 0)} |",
-        f"| DS Power (Min/Avg/Max) | {s.get('ds_power_min')} / {s.get('ds_power_avg')} / {s.get('ds_power_max')} dBmV |",
-        f"| DS SNR (Min/Avg) | {s.get('ds_snr_min')} / {s.get('ds_snr_avg')} dB |",
-        f"| DS Correctable Errors | {s.get('ds_correctable_errors', 0):,} |",
-        f"| DS Uncorrectable Errors | {s.get('ds_uncorrectable_errors', 0):,} |",
-        f"| Upstream Channels | {s.get('us_total', 0)} |",
-        f"| US Power (Min/Avg/Max) | {s.get('us_power_min')} / {s.get('us_power_avg')} / {s.get('us_power_max')} dBmV |",
-        "",
-        "## Downstream Channels",
-        "| Ch | Frequency | Power (dBmV) | SNR (dB) | Modulation | Corr. Errors | Uncorr. Errors | DOCSIS | Health |",
-        "|----|-----------|-------------|----------|------------|-------------|---------------|--------|--------|",
-    ]
-    for ch in ds:
-        lines.append(
-            f"| {ch.get('channel_id','')} | {ch.get('frequency','')} | {ch.get('power','')} "
-            f"| {ch.get('snr', '-')} | {ch.get('modulation','')} "
-            f"| {ch.get('correctable_errors', 0):,} | {ch.get('uncorrectable_errors', 0):,} "
-            f"| {ch.get('docsis_version','')} | {ch.get('health','')} |"
-        )
-    lines += [
-        "",
-        "## Upstream Channels",
-        "| Ch | Frequency | Power (dBmV) | Modulation | Multiplex | DOCSIS | Health |",
-        "|----|-----------|-------------|------------|-----------|--------|--------|",
-    ]
-    for ch in us:
-        lines.append(
-            f"| {ch.get('channel_id','')} | {ch.get('frequency','')} | {ch.get('power','')} "
-            f"| {ch.get('modulation','')} | {ch.get('multiplex','')} "
-            f"| {ch.get('docsis_version','')} | {ch.get('health','')} |"
-        )
-    lines += [
-        "",
-        "## Reference Values",
-        "| Metric | Good | Marginal | Poor |",
-        "|--------|------|----------|------|",
-        "| DS Power | -7 to +7 dBmV | +/-7 to +/-10 | > +/-10 dBmV |",
-        "| US Power | 35 to 49 dBmV | 50 to 54 | > 54 dBmV |",
-        "| SNR/MER | > 30 dB | 25 to 30 | < 25 dB |",
-        "| Uncorr. Errors | low | - | > 10,000 |",
-        "",
-        "## Questions",
-        "Please analyze this data and provide:",
-        "1. Overall connection health assessment",
-        "2. Channels that need attention (with reasons)",
-        "3. Error rate analysis and whether it indicates a problem",
-        "4. Specific recommendations to improve connection quality",
-    ]
-    return jsonify({"text": "\n".join(l for l in lines if l is not None)})
+    entry = _export_cache["entry"]
+    if entry is not None and entry[0] is state:
+        payload = entry[1]
+    else:
+        payload = _refresh_export_cache(state)
+    return app.response_class(payload, mimetype="application/json")
+
+
+def _build_export_text(state):
+    """Render the markdown status report for the given state snapshot."""
+    analysis = state.analysis
+    conn = state.connection_info or {}
+    return _REPORT_TPL.render(
+        s=analysis["summary"],
+        ds=analysis["ds_channels"],
+        us=analysis["us_channels"],
+        ts=state.last_update,
+        isp=_config_manager.get("isp_name", "") if _config_manager else "",
+        ds_mbps=conn.get("max_downstream_kbps", 0) // 1000 if conn else 0,
+        us_mbps=conn.get("max_upstream_kbps", 0) // 1000 if conn else 0,
+    )
 
 
 @app.route("/api/snapshots")
@@ -577,7 +754,7 @@ def api_export():
 def api_snapshots():
     """Return list of available snapshot timestamps."""
     if _storage:
-        return jsonify(_storage.get_snapshot_list())
+        return app.response_class(_storage.get_snapshot_list_json(), mimetype="application/json")
     return jsonify([])
 
 
@@ -594,7 +771,7 @@ def api_bqm_dates():
 @require_auth
 def api_bqm_image(date):
     """Return BQM graph PNG for a given date."""
-    if not _DATE_RE.match(date):
+    if not _is_valid_date(date):
         return jsonify({"error": "Invalid date format"}), 400
     if not _storage:
         return jsonify({"error": "No storage"}), 404
@@ -613,8 +790,7 @@ def api_speedtest():
     """Return speedtest results from local cache, with delta fetch from STT."""
     if not _config_manager or not _config_manager.is_speedtest_configured():
         return jsonify([])
-    count = request.args.get("count", 2000, type=int)
-    count = max(1, min(count, 5000))
+    count = _arg_int("count", 2000, 1, 5000)
     # Delta fetch: get new results from STT API and cache them
     if _storage:
         try:
@@ -698,8 +874,8 @@ def api_incidents_list():
     """Return list of incidents with attachment counts."""
     if not _storage:
         return jsonify([])
-    limit = request.args.get("limit", 100, type=int)
-    offset = request.args.get("offset", 0, type=int)
+    limit = _arg_int("limit", 100, 1, MAX_LIMIT)
+    offset = _arg_int("offset", 0, 0, MAX_OFFSET)
     return jsonify(_storage.get_incidents(limit=limit, offset=offset))
 
 
@@ -709,13 +885,13 @@ def api_incidents_create():
     """Create a new incident."""
     if not _storage:
         return jsonify({"error": "Storage not initialized"}), 500
-    data = request.get_json()
+    data = request.get_json(silent=True)
     if not data:
         return jsonify({"error": "No data"}), 400
     date = (data.get("date") or "").strip()
     title = (data.get("title") or "").strip()
     description = (data.get("description") or "").strip()
-    if not date or not _DATE_RE.match(date):
+    if not date or not _is_valid_date(date):
         return jsonify({"error": "Invalid date format (YYYY-MM-DD)"}), 400
     if not title:
         return jsonify({"error": "Title is required"}), 400
@@ -745,13 +921,13 @@ def api_incident_update(incident_id):
     """Update an existing incident."""
     if not _storage:
         return jsonify({"error": "Storage not initialized"}), 500
-    data = request.get_json()
+    data = request.get_json(silent=True)
     if not data:
         return jsonify({"error": "No data"}), 400
     date = (data.get("date") or "").strip()
     title = (data.get("title") or "").strip()
     description = (data.get("description") or "").strip()
-    if not date or not _DATE_RE.match(date):
+    if not date or not _is_valid_date(date):
         return jsonify({"error": "Invalid date format (YYYY-MM-DD)"}), 400
     if not title:
         return jsonify({"error": "Title is required"}), 400
@@ -838,8 +1014,8 @@ def api_events_list():
     """Return list of events with optional filters."""
     if not _storage:
         return jsonify({"events": [], "unacknowledged_count": 0})
-    limit = request.args.get("limit", 200, type=int)
-    offset = request.args.get("offset", 0, type=int)
+    limit = _arg_int("limit", 200, 1, MAX_LIMIT)
+    offset = _arg_int("offset", 0, 0, MAX_OFFSET)
     severity = request.args.get("severity") or None
     event_type = request.args.get("event_type") or None
     ack_param = request.args.get("acknowledged")
@@ -902,37 +1078,57 @@ def api_channel_history():
         return jsonify([])
     channel_id = request.args.get("channel_id", type=int)
     direction = request.args.get("direction", "ds")
-    days = request.args.get("days", 7, type=int)
+    days = _arg_int("days", 7, 1, 90)
     if channel_id is None:
         return jsonify({"error": "channel_id is required"}), 400
     if direction not in ("ds", "us"):
         return jsonify({"error": "direction must be 'ds' or 'us'"}), 400
-    days = max(1, min(days, 90))
     return jsonify(_storage.get_channel_history(channel_id, direction, days))
 
 
+_SECURITY_HEADERS = (
+    ("X-Content-Type-Options", "nosniff"),
+    ("X-Frame-Options", "DENY"),
+    ("X-XSS-Protection", "1; mode=block"),
+    ("Referrer-Policy", "strict-origin-when-cross-origin"),
+)
+
+
 @app.after_request
 def add_security_headers(response):
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+    # Views never set these, so append in one pass instead of four replacing setitems
+    response.headers.extend(_SECURITY_HEADERS)
     return response
 
 
+# Background PDF report jobs: job_id -> (Future, submitted_at)
+_report_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report")
+_report_jobs = {}
+_report_jobs_lock = threading.Lock()
+_REPORT_JOB_TTL = 600  # drop results nobody picked up after 10 minutes
+
+
+def _prune_report_jobs():
+    """Forget report jobs older than _REPORT_JOB_TTL. Caller holds the lock."""
+    cutoff = time.time() - _REPORT_JOB_TTL
+    for job_id in [j for j, (_, ts) in _report_jobs.items() if ts < cutoff]:
+        del _report_jobs[job_id]
+
+
 @app.route("/api/report")
 @require_auth
 def api_report():
-    """Generate a PDF incident report."""
+    """Start PDF incident report generation in the background.
+    Returns a job id; poll /api/report/<job_id> for the PDF."""
     from .report import generate_report
 
-    analysis = _state.get("analysis")
+    state = _state
+    analysis = state.analysis
     if not analysis:
         return jsonify({"error": "No data available"}), 404
 
     # Time range: default last 7 days, configurable via ?days=N
-    days = request.args.get("days", 7, type=int)
-    days = max(1, min(days, 90))
+    days = _arg_int("days", 7, 1, 90)
     end_ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
     start_ts = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S")
 
@@ -947,10 +1143,35 @@ def api_report():
             "modem_type": _config_manager.get("modem_type", ""),
         }
 
-    conn_info = _state.get("connection_info") or {}
+    conn_info = state.connection_info or {}
     lang = _get_lang()
 
-    pdf_bytes = generate_report(snapshots, analysis, config, conn_info, lang)
+    job_id = uuid.uuid4().hex
+    future = _report_executor.submit(generate_report, snapshots, analysis, config, conn_info, lang)
+    with _report_jobs_lock:
+        _prune_report_jobs()
+        _report_jobs[job_id] = (future, time.time())
+    return jsonify({"job_id": job_id}), 202
+
+
+@app.route("/api/report/<job_id>")
+@require_auth
+def api_report_result(job_id):
+    """Return the finished PDF for a report job, or 202 while it is still running."""
+    with _report_jobs_lock:
+        job = _report_jobs.get(job_id)
+        if job and job[0].done():
+            del _report_jobs[job_id]
+    if not job:
+        return jsonify({"error": "Unknown report job"}), 404
+    future = job[0]
+    if not future.done():
+        return jsonify({"status": "pending"}), 202
+    try:
+        pdf_bytes = future.result()
+    except Exception as e:
+        log.error("Report generation failed: %s", e)
+        return jsonify({"error": str(e)}), 500
 
     response = make_response(pdf_bytes)
     response.headers["Content-Type"] = "application/pdf"
@@ -965,12 +1186,12 @@ def api_complaint():
     """Generate ISP complaint letter as text."""
     from .report import generate_complaint_text
 
-    analysis = _state.get("analysis")
+    state = _state
+    analysis = state.analysis
     if not analysis:
         return jsonify({"error": "No data available"}), 404
 
-    days = request.args.get("days", 7, type=int)
-    days = max(1, min(days, 90))
+    days = _arg_int("days", 7, 1, 90)
     end_ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
     start_ts = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S")
 
@@ -1001,12 +1222,16 @@ def api_complaint():
 @require_auth
 def api_changelog():
     """Return full changelog data."""
-    return jsonify(_changelog)
+    resp = app.response_class(_CHANGELOG_JSON, mimetype="application/json")
+    resp.set_etag(_CHANGELOG_ETAG)
+    resp.headers["Cache-Control"] = "private, max-age=300"
+    return resp.make_conditional(request)
 
 
 @app.route("/health")
 def health():
     """Simple health check endpoint."""
-    if _state["analysis"]:
-        return {"status": "ok", "docsis_health": _state["analysis"]["summary"]["health"]}
+    analysis = _state.analysis
+    if analysis:
+        return {"status": "ok", "docsis_health": analysis["summary"]["health"]}
     return {"status": "ok", "docsis_health": "waiting"}
@@ -0,0 +1,47 @@
+"""Shared pytest fixtures."""
+
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _fast_password_hash():
+    """Hash admin passwords with single-iteration pbkdf2 instead of scrypt.
+
+    Tests only check the hash prefix and round-trip verification, so the
+    memory-hard default adds cost without coverage.
+    """
+    import app.config as config_module
+
+    orig = config_module.generate_password_hash
+
+    def fast_hash(password, method="pbkdf2:sha256:1", salt_length=8):
+        return orig(password, method=method, salt_length=salt_length)
+
+    config_module.generate_password_hash = fast_hash
+    yield
+    config_module.generate_password_hash = orig
+
+
+@pytest.fixture(scope="class")
+def web_config_values():
+    """Keys web_env saves to its config; override in a module or class to add more."""
+    return {"modem_password": "test"}
+
+
+@pytest.fixture(scope="class")
+def web_env(tmp_path_factory, web_config_values):
+    """(test client, ConfigManager) built once per test class.
+
+    Tests bind them to the web module themselves, with init_config() and
+    init_storage() in a function-scoped fixture, so each file only has to
+    supply its own storage.
+    """
+    from app.config import ConfigManager
+    from app.web import app
+
+    mgr = ConfigManager(str(tmp_path_factory.mktemp("web") / "data"))
+    mgr.save(web_config_values)
+    app.config["TESTING"] = True
+    # Not entered as a context manager: a preserved request context would
+    # leak its g into later test_request_context blocks.
+    return app.test_client(), mgr
@@ -1,6 +1,9 @@
 """Tests for DOCSIS channel health analyzer."""
 
+import json
+
 import pytest
+from app import analyzer
 from app.analyzer import analyze, _parse_float
 
 
@@ -72,6 +75,31 @@ class TestParseFloat:
         assert _parse_float("bad", default=-1.0) == -1.0
 
 
+# -- Threshold loading --
+
+@pytest.fixture
+def load_custom_thresholds(tmp_path, monkeypatch):
+    """Return a loader for a temporary thresholds.json; the shipped file is
+    reloaded on teardown so later tests see the real thresholds."""
+    path = tmp_path / "thresholds.json"
+
+    def load(data):
+        path.write_text(json.dumps(data))
+        analyzer._load_thresholds()
+
+    with monkeypatch.context() as m:
+        m.setattr(analyzer, "_THRESHOLDS_PATH", str(path))
+        yield load
+    analyzer._load_thresholds()
+
+
+class TestThresholdCache:
+    def test_reload_clears_memoized_thresholds(self, load_custom_thresholds):
+        assert analyzer._get_snr_thresholds("256QAM")["crit_min"] != 99.0
+        load_custom_thresholds({"snr": {"256QAM": {"immediate_min": 99.0}}})
+        assert analyzer._get_snr_thresholds("256QAM")["crit_min"] == 99.0
+
+
 # -- Health assessment: good --
 
 class TestHealthGood:
@@ -1,128 +1,144 @@
 """Tests for web UI authentication."""
 
-import json
 import pytest
-from app.web import app, update_state, init_config, init_storage
+import app.web as web_module
+from app.web import app, update_state, init_config, init_storage, State
 from app.config import ConfigManager
 
 
-@pytest.fixture
-def auth_config(tmp_path):
-    """Config with admin_password set."""
-    mgr = ConfigManager(str(tmp_path / "data"))
-    mgr.save({"modem_password": "test", "admin_password": "secret123"})
-    return mgr
+_HEALTHY_ANALYSIS = {
+    "summary": {
+        "ds_total": 1, "us_total": 1,
+        "ds_power_min": 0, "ds_power_max": 0, "ds_power_avg": 0,
+        "us_power_min": 0, "us_power_max": 0, "us_power_avg": 0,
+        "ds_snr_min": 0, "ds_snr_avg": 0,
+        "ds_correctable_errors": 0, "ds_uncorrectable_errors": 0,
+        "health": "good", "health_issues": [],
+    },
+    "ds_channels": [],
+    "us_channels": [],
+}
 
 
-@pytest.fixture
-def noauth_config(tmp_path):
-    """Config without admin_password."""
-    mgr = ConfigManager(str(tmp_path / "data"))
-    mgr.save({"modem_password": "test"})
-    return mgr
+# The config (and the admin password hash) comes from the class-scoped
+# web_env fixture; each test only rebinds the web globals and drops the
+# session cookie.
+
+@pytest.fixture(scope="class")
+def web_config_values(request):
+    """Only TestAuthEnabled sets an admin password."""
+    values = {"modem_password": "test"}
+    if request.cls is TestAuthEnabled:
+        values["admin_password"] = "secret123"
+    return values
 
 
 @pytest.fixture
-def auth_client(auth_config):
-    init_config(auth_config)
+def client(web_env):
+    c, mgr = web_env
+    init_config(mgr)
     init_storage(None)
-    app.config["TESTING"] = True
-    with app.test_client() as client:
-        yield client
+    c.delete_cookie("session")
+    return c
 
 
 @pytest.fixture
-def noauth_client(noauth_config):
-    init_config(noauth_config)
-    init_storage(None)
-    app.config["TESTING"] = True
-    with app.test_client() as client:
-        yield client
+def _healthy_state(monkeypatch):
+    """Web state holding _HEALTHY_ANALYSIS; the previous state is restored after."""
+    monkeypatch.setattr(web_module, "_state", State())
+    update_state(analysis=_HEALTHY_ANALYSIS)
 
 
+@pytest.mark.usefixtures("_healthy_state")
 class TestAuthDisabled:
-    def test_index_accessible(self, noauth_client):
-        update_state(analysis={"summary": {"ds_total": 1, "us_total": 1, "ds_power_min": 0, "ds_power_max": 0, "ds_power_avg": 0, "us_power_min": 0, "us_power_max": 0, "us_power_avg": 0, "ds_snr_min": 0, "ds_snr_avg": 0, "ds_correctable_errors": 0, "ds_uncorrectable_errors": 0, "health": "good", "health_issues": []}, "ds_channels": [], "us_channels": []})
-        resp = noauth_client.get("/")
+    def test_index_accessible(self, client):
+        resp = client.get("/")
         assert resp.status_code == 200
 
-    def test_settings_accessible(self, noauth_client):
-        resp = noauth_client.get("/settings")
+    def test_settings_accessible(self, client):
+        resp = client.get("/settings")
         assert resp.status_code == 200
 
-    def test_login_redirects_to_index(self, noauth_client):
-        resp = noauth_client.get("/login")
+    def test_login_redirects_to_index(self, client):
+        resp = client.get("/login")
         assert resp.status_code == 302
 
-
-class TestAuthEnabled:
-    def test_index_redirects_to_login(self, auth_client):
-        resp = auth_client.get("/")
+    def test_setting_password_enables_auth(self, client, tmp_path):
+        # Uses its own config: saving a password would leak into the shared one
+        mgr = ConfigManager(str(tmp_path / "data"))
+        mgr.save({"modem_password": "test"})
+        init_config(mgr)
+        resp = client.post(
+            "/api/config",
+            json={"admin_password": "newpass"},
+        )
+        assert resp.status_code == 200
+        resp = client.get("/settings")
         assert resp.status_code == 302
         assert "/login" in resp.headers["Location"]
 
-    def test_settings_redirects_to_login(self, auth_client):
-        resp = auth_client.get("/settings")
+
+@pytest.mark.usefixtures("_healthy_state")
+class TestAuthEnabled:
+    @pytest.mark.parametrize("method,path,kwargs", [
+        ("get", "/", {}),
+        ("get", "/settings", {}),
+        ("post", "/api/config", {"json": {"poll_interval": 120}}),
+        ("get", "/api/calendar", {}),
+        ("get", "/api/snapshots", {}),
+        ("get", "/api/export", {}),
+        ("get", "/api/trends", {}),
+    ])
+    def test_requires_auth(self, client, method, path, kwargs):
+        resp = getattr(client, method)(path, **kwargs)
         assert resp.status_code == 302
         assert "/login" in resp.headers["Location"]
 
-    def test_health_always_accessible(self, auth_client):
-        update_state(analysis={"summary": {"ds_total": 1, "us_total": 1, "ds_power_min": 0, "ds_power_max": 0, "ds_power_avg": 0, "us_power_min": 0, "us_power_max": 0, "us_power_avg": 0, "ds_snr_min": 0, "ds_snr_avg": 0, "ds_correctable_errors": 0, "ds_uncorrectable_errors": 0, "health": "good", "health_issues": []}, "ds_channels": [], "us_channels": []})
-        resp = auth_client.get("/health")
+    def test_health_always_accessible(self, client):
+        resp = client.get("/health")
         assert resp.status_code == 200
 
-    def test_login_page_renders(self, auth_client):
-        resp = auth_client.get("/login")
+    def test_login_page_renders(self, client):
+        resp = client.get("/login")
         assert resp.status_code == 200
         assert b"DOCSight" in resp.data
 
-    def test_login_wrong_password(self, auth_client):
-        resp = auth_client.post("/login", data={"password": "wrong"})
+    def test_login_wrong_password(self, client):
+        resp = client.post("/login", data={"password": "wrong"})
         assert resp.status_code == 200  # stays on login page
 
-    def test_login_correct_password(self, auth_client):
-        resp = auth_client.post("/login", data={"password": "secret123"}, follow_redirects=False)
+    def test_login_correct_password(self, client):
+        resp = client.post("/login", data={"password": "secret123"}, follow_redirects=False)
         assert resp.status_code == 302
         assert resp.headers["Location"] == "/"
 
-    def test_session_persists(self, auth_client):
-        auth_client.post("/login", data={"password": "secret123"})
-        update_state(analysis={"summary": {"ds_total": 1, "us_total": 1, "ds_power_min": 0, "ds_power_max": 0, "ds_power_avg": 0, "us_power_min": 0, "us_power_max": 0, "us_power_avg": 0, "ds_snr_min": 0, "ds_snr_avg": 0, "ds_correctable_errors": 0, "ds_uncorrectable_errors": 0, "health": "good", "health_issues": []}, "ds_channels": [], "us_channels": []})
-        resp = auth_client.get("/")
+    def test_session_persists(self, client):
+        client.post("/login", data={"password": "secret123"})
+        resp = client.get("/")
         assert resp.status_code == 200
 
-    def test_logout(self, auth_client):
-        auth_client.post("/login", data={"password": "secret123"})
-        auth_client.get("/logout")
-        resp = auth_client.get("/")
+    def test_verified_cookie_cached(self, client):
+        client.post("/login", data={"password": "secret123"})
+        client.get("/")
+        cookie = client.get_cookie("session").value
+        data, _ = app.session_interface._verified[cookie]
+        assert data["authenticated"] is True
+
+    def test_expired_cache_entry_reverified(self, client, monkeypatch):
+        # An entry older than max_age must go back through the signer
+        monkeypatch.setitem(app.session_interface._verified, "forged", ({"authenticated": True}, 0))
+        client.set_cookie("session", "forged")
+        resp = client.get("/")
         assert resp.status_code == 302
-        assert "/login" in resp.headers["Location"]
 
-    def test_api_config_requires_auth(self, auth_client):
-        resp = auth_client.post(
-            "/api/config",
-            data=json.dumps({"poll_interval": 120}),
-            content_type="application/json",
-        )
-        assert resp.status_code == 302
-
-    def test_api_calendar_requires_auth(self, auth_client):
-        resp = auth_client.get("/api/calendar")
-        assert resp.status_code == 302
-
-    def test_api_snapshots_requires_auth(self, auth_client):
-        resp = auth_client.get("/api/snapshots")
-        assert resp.status_code == 302
-
-    def test_api_export_requires_auth(self, auth_client):
-        resp = auth_client.get("/api/export")
-        assert resp.status_code == 302
-
-    def test_api_trends_requires_auth(self, auth_client):
-        resp = auth_client.get("/api/trends")
+    def test_logout(self, client):
+        client.post("/login", data={"password": "secret123"})
+        client.get("/logout")
+        resp = client.get("/")
         assert resp.status_code == 302
+        assert "/login" in resp.headers["Location"]
 
-    def test_password_hashed_not_plaintext(self, auth_config):
-        stored = auth_config.get("admin_password")
+    def test_password_hashed_not_plaintext(self, web_env):
+        stored = web_env[1].get("admin_password")
         assert stored != "secret123"
         assert stored.startswith(("scrypt:", "pbkdf2:"))
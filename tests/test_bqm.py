@@ -1,53 +1,57 @@
 """Tests for ThinkBroadband BQM graph fetching, storage, and API."""
 
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import MagicMock
 
+import app.thinkbroadband as thinkbroadband
 from app.thinkbroadband import fetch_graph
 from app.storage import SnapshotStorage
-from app.web import app, init_config, init_storage
-from app.config import ConfigManager
+from app.web import init_config, init_storage
+
+
+SAMPLE_PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 200
+
+
+def _urlopen_response(body):
+    """Context-manager mock as returned by urlopen(), reading body."""
+    mock_resp = MagicMock()
+    mock_resp.read.return_value = body
+    mock_resp.__enter__ = lambda s: s
+    mock_resp.__exit__ = MagicMock(return_value=False)
+    return mock_resp
 
 
 # ── Fetcher Tests ──
 
 
+@pytest.fixture
+def mock_urlopen(monkeypatch):
+    """Replace urllib.request.urlopen as seen by app.thinkbroadband."""
+    urlopen = MagicMock()
+    monkeypatch.setattr(thinkbroadband.urllib.request, "urlopen", urlopen)
+    return urlopen
+
+
 class TestBQMFetcher:
-    @patch("app.thinkbroadband.urllib.request.urlopen")
     def test_fetch_success(self, mock_urlopen):
-        mock_resp = MagicMock()
-        mock_resp.read.return_value = b"\x89PNG" + b"\x00" * 200
-        mock_resp.__enter__ = lambda s: s
-        mock_resp.__exit__ = MagicMock(return_value=False)
-        mock_urlopen.return_value = mock_resp
+        mock_urlopen.return_value = _urlopen_response(SAMPLE_PNG)
 
         result = fetch_graph("https://example.com/graph.png")
         assert result is not None
         assert len(result) > 100
 
-    @patch("app.thinkbroadband.urllib.request.urlopen")
     def test_fetch_empty_response(self, mock_urlopen):
-        mock_resp = MagicMock()
-        mock_resp.read.return_value = b""
-        mock_resp.__enter__ = lambda s: s
-        mock_resp.__exit__ = MagicMock(return_value=False)
-        mock_urlopen.return_value = mock_resp
+        mock_urlopen.return_value = _urlopen_response(b"")
 
         result = fetch_graph("https://example.com/graph.png")
         assert result is None
 
-    @patch("app.thinkbroadband.urllib.request.urlopen")
     def test_fetch_too_small(self, mock_urlopen):
-        mock_resp = MagicMock()
-        mock_resp.read.return_value = b"tiny"
-        mock_resp.__enter__ = lambda s: s
-        mock_resp.__exit__ = MagicMock(return_value=False)
-        mock_urlopen.return_value = mock_resp
+        mock_urlopen.return_value = _urlopen_response(b"tiny")
 
         result = fetch_graph("https://example.com/graph.png")
         assert result is None
 
-    @patch("app.thinkbroadband.urllib.request.urlopen")
     def test_fetch_network_error(self, mock_urlopen):
         mock_urlopen.side_effect = Exception("Connection refused")
         result = fetch_graph("https://example.com/graph.png")
@@ -73,7 +77,7 @@ def storage(tmp_path):
 
 @pytest.fixture
 def sample_png():
-    return b"\x89PNG\r\n\x1a\n" + b"\x00" * 200
+    return SAMPLE_PNG
 
 
 class TestBQMStorage:
@@ -149,33 +153,34 @@ class TestBQMStorage:
 # ── API Tests ──
 
 
-@pytest.fixture
-def bqm_storage(tmp_path, sample_png):
-    """Storage pre-loaded with a BQM graph for today."""
+@pytest.fixture(scope="class")
+def bqm_storage(tmp_path_factory):
+    """Storage pre-loaded with a BQM graph for today; the API tests only read it."""
     import sqlite3
     from datetime import datetime
-    db_path = str(tmp_path / "bqm_api.db")
+    db_path = str(tmp_path_factory.mktemp("bqm_api") / "bqm_api.db")
     s = SnapshotStorage(db_path, max_days=7)
     today = datetime.now().strftime("%Y-%m-%d")
     with sqlite3.connect(db_path) as conn:
         conn.execute(
             "INSERT INTO bqm_graphs (date, timestamp, image_blob) VALUES (?, ?, ?)",
-            (today, datetime.now().strftime("%Y-%m-%dT%H:%M:%S"), sample_png),
+            (today, datetime.now().strftime("%Y-%m-%dT%H:%M:%S"), SAMPLE_PNG),
         )
     return s, today
 
 
+@pytest.fixture(scope="class")
+def web_config_values():
+    return {"modem_password": "test", "bqm_url": "https://example.com/graph.png"}
+
+
 @pytest.fixture
-def bqm_client(tmp_path, bqm_storage):
+def bqm_client(web_env, bqm_storage):
+    client, mgr = web_env
     s, today = bqm_storage
-    data_dir = str(tmp_path / "data")
-    mgr = ConfigManager(data_dir)
-    mgr.save({"modem_password": "test", "bqm_url": "https://example.com/graph.png"})
     init_config(mgr)
     init_storage(s)
-    app.config["TESTING"] = True
-    with app.test_client() as client:
-        yield client, today
+    return client, today
 
 
 class TestBQMAPI:
@@ -203,14 +208,10 @@ class TestBQMAPI:
         resp = client.get("/api/bqm/image/invalid")
         assert resp.status_code == 400
 
-    def test_bqm_dates_empty(self, tmp_path):
-        data_dir = str(tmp_path / "data3")
-        mgr = ConfigManager(data_dir)
-        mgr.save({"modem_password": "test"})
+    def test_bqm_dates_empty(self, web_env):
+        client, mgr = web_env
         init_config(mgr)
         init_storage(None)
-        app.config["TESTING"] = True
-        with app.test_client() as client:
-            resp = client.get("/api/bqm/dates")
-            assert resp.status_code == 200
-            assert resp.get_json() == []
+        resp = client.get("/api/bqm/dates")
+        assert resp.status_code == 200
+        assert resp.get_json() == []
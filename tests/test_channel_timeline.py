@@ -1,13 +1,13 @@
 """Tests for per-channel timeline: storage, /api/channels, /api/channel-history."""
 
 import json
+import sqlite3
 import time
 import pytest
 from datetime import datetime, timedelta
 
 from app.storage import SnapshotStorage
-from app.web import app, init_config, init_storage
-from app.config import ConfigManager
+from app.web import init_config, init_storage
 
 
 # ── Fixtures ──
@@ -38,32 +38,51 @@ def _make_analysis(ds_channels=None, us_channels=None):
     }
 
 
+# save_snapshot only serializes its argument, so tests share one instance.
+_DEFAULT_ANALYSIS = _make_analysis()
+
+
+def _mem_storage(name):
+    """SnapshotStorage on a shared-cache in-memory SQLite database."""
+    return SnapshotStorage(f"file:{name}?mode=memory&cache=shared", max_days=30)
+
+
+def _clear_snapshots(s):
+    with sqlite3.connect(s.db_path, uri=True) as conn:
+        conn.execute("DELETE FROM snapshots")
+
+
+@pytest.fixture(scope="class")
+def _class_storage(request):
+    return _mem_storage(f"chan_{request.cls.__name__}")
+
+
 @pytest.fixture
-def storage(tmp_path):
-    db_path = str(tmp_path / "test.db")
-    return SnapshotStorage(db_path, max_days=30)
+def storage(_class_storage):
+    _clear_snapshots(_class_storage)
+    return _class_storage
+
+
+@pytest.fixture(scope="class")
+def _api_storage(request):
+    return _mem_storage(f"api_{request.cls.__name__}")
 
 
 @pytest.fixture
-def client(tmp_path):
-    db_path = str(tmp_path / "api.db")
-    s = SnapshotStorage(db_path, max_days=30)
-    data_dir = str(tmp_path / "data")
-    mgr = ConfigManager(data_dir)
-    mgr.save({"modem_password": "test"})
+def client(web_env, _api_storage):
+    c, mgr = web_env
+    _clear_snapshots(_api_storage)
     init_config(mgr)
-    init_storage(s)
-    app.config["TESTING"] = True
-    with app.test_client() as c:
-        yield c, s
+    init_storage(_api_storage)
+    return c, _api_storage
 
 
 # ── Storage Tests ──
 
 class TestGetChannelHistory:
     def test_returns_time_series(self, storage):
-        storage.save_snapshot(_make_analysis())
-        storage.save_snapshot(_make_analysis())
+        storage.save_snapshot(_DEFAULT_ANALYSIS)
+        storage.save_snapshot(_DEFAULT_ANALYSIS)
         result = storage.get_channel_history(1, "ds", days=7)
         assert len(result) == 2
         assert result[0]["power"] == 5.2
@@ -75,7 +94,7 @@ class TestGetChannelHistory:
         assert "timestamp" in result[0]
 
     def test_filters_by_channel_id(self, storage):
-        storage.save_snapshot(_make_analysis())
+        storage.save_snapshot(_DEFAULT_ANALYSIS)
         result_ch1 = storage.get_channel_history(1, "ds", days=7)
         result_ch2 = storage.get_channel_history(2, "ds", days=7)
         assert len(result_ch1) == 1
@@ -84,13 +103,13 @@ class TestGetChannelHistory:
         assert result_ch2[0]["power"] == 4.8
 
     def test_upstream_channel(self, storage):
-        storage.save_snapshot(_make_analysis())
+        storage.save_snapshot(_DEFAULT_ANALYSIS)
         result = storage.get_channel_history(1, "us", days=7)
         assert len(result) == 1
         assert result[0]["power"] == 42.0
 
     def test_nonexistent_channel(self, storage):
-        storage.save_snapshot(_make_analysis())
+        storage.save_snapshot(_DEFAULT_ANALYSIS)
         result = storage.get_channel_history(99, "ds", days=7)
         assert result == []
 
@@ -99,19 +118,21 @@ class TestGetChannelHistory:
         assert result == []
 
     def test_respects_days_param(self, storage):
-        # Save snapshot with a timestamp in the past
-        import sqlite3
-        old_ts = (datetime.now() - timedelta(days=10)).strftime("%Y-%m-%dT%H:%M:%S")
-        analysis = _make_analysis()
-        with sqlite3.connect(storage.db_path) as conn:
-            conn.execute(
+        # One snapshot 10 days old and one recent, inserted in one transaction
+        now = datetime.now()
+        analysis = _DEFAULT_ANALYSIS
+        payload = (json.dumps(analysis["summary"]),
+                   json.dumps(analysis["ds_channels"]),
+                   json.dumps(analysis["us_channels"]))
+        rows = [
+            ((now - timedelta(days=10)).strftime("%Y-%m-%dT%H:%M:%S"), *payload),
+            (now.strftime("%Y-%m-%dT%H:%M:%S"), *payload),
+        ]
+        with sqlite3.connect(storage.db_path, uri=True) as conn:
+            conn.executemany(
                 "INSERT INTO snapshots (timestamp, summary_json, ds_channels_json, us_channels_json) VALUES (?, ?, ?, ?)",
-                (old_ts, json.dumps(analysis["summary"]),
-                 json.dumps(analysis["ds_channels"]),
-                 json.dumps(analysis["us_channels"])),
+                rows,
             )
-        # Recent snapshot
-        storage.save_snapshot(_make_analysis())
         # 7-day window should only get the recent one
         result = storage.get_channel_history(1, "ds", days=7)
         assert len(result) == 1
@@ -122,7 +143,7 @@ class TestGetChannelHistory:
 
 class TestGetCurrentChannels:
     def test_returns_channels(self, storage):
-        storage.save_snapshot(_make_analysis())
+        storage.save_snapshot(_DEFAULT_ANALYSIS)
         result = storage.get_current_channels()
         assert len(result["ds_channels"]) == 2
         assert len(result["us_channels"]) == 1
@@ -138,10 +159,10 @@ class TestGetCurrentChannels:
 class TestChannelsEndpoint:
     def test_returns_channels(self, client):
         c, s = client
-        s.save_snapshot(_make_analysis())
+        s.save_snapshot(_DEFAULT_ANALYSIS)
         resp = c.get("/api/channels")
         assert resp.status_code == 200
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert len(data["ds_channels"]) == 2
         assert len(data["us_channels"]) == 1
 
@@ -149,7 +170,7 @@ class TestChannelsEndpoint:
         c, s = client
         resp = c.get("/api/channels")
         assert resp.status_code == 200
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert data["ds_channels"] == []
         assert data["us_channels"] == []
 
@@ -157,50 +178,37 @@ class TestChannelsEndpoint:
 class TestChannelHistoryEndpoint:
     def test_returns_history(self, client):
         c, s = client
-        s.save_snapshot(_make_analysis())
+        s.save_snapshot(_DEFAULT_ANALYSIS)
         resp = c.get("/api/channel-history?channel_id=1&direction=ds&days=7")
         assert resp.status_code == 200
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert len(data) == 1
         assert data[0]["power"] == 5.2
 
-    def test_missing_channel_id(self, client):
-        c, s = client
-        resp = c.get("/api/channel-history?direction=ds&days=7")
-        assert resp.status_code == 400
-
-    def test_invalid_direction(self, client):
-        c, s = client
-        resp = c.get("/api/channel-history?channel_id=1&direction=invalid")
-        assert resp.status_code == 400
-
     def test_upstream_channel(self, client):
         c, s = client
-        s.save_snapshot(_make_analysis())
+        s.save_snapshot(_DEFAULT_ANALYSIS)
         resp = c.get("/api/channel-history?channel_id=1&direction=us&days=7")
         assert resp.status_code == 200
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert len(data) == 1
         assert data[0]["power"] == 42.0
 
-    def test_no_storage(self, tmp_path):
-        data_dir = str(tmp_path / "data2")
-        mgr = ConfigManager(data_dir)
-        mgr.save({"modem_password": "test"})
+    def test_no_storage(self, web_env):
+        c, mgr = web_env
         init_config(mgr)
         init_storage(None)
-        app.config["TESTING"] = True
-        with app.test_client() as c:
-            resp = c.get("/api/channel-history?channel_id=1&direction=ds")
-            assert resp.status_code == 200
-            assert json.loads(resp.data) == []
-
-    def test_days_clamped(self, client):
-        c, s = client
-        s.save_snapshot(_make_analysis())
-        # days=0 should be clamped to 1
-        resp = c.get("/api/channel-history?channel_id=1&direction=ds&days=0")
+        resp = c.get("/api/channel-history?channel_id=1&direction=ds")
         assert resp.status_code == 200
-        # days=200 should be clamped to 90
-        resp2 = c.get("/api/channel-history?channel_id=1&direction=ds&days=200")
-        assert resp2.status_code == 200
+        assert resp.get_json() == []
+
+    @pytest.mark.parametrize("qs,expected_status", [
+        ("channel_id=1&direction=ds&days=0", 200),    # clamped to 1
+        ("channel_id=1&direction=ds&days=200", 200),  # clamped to 90
+        ("direction=ds&days=7", 400),                 # missing channel_id
+        ("channel_id=1&direction=invalid", 400),
+    ])
+    def test_channel_history_edges(self, client, qs, expected_status):
+        c, s = client
+        s.save_snapshot(_DEFAULT_ANALYSIS)
+        assert c.get(f"/api/channel-history?{qs}").status_code == expected_status
@@ -16,22 +16,28 @@ def config(tmp_data_dir):
     return ConfigManager(tmp_data_dir)
 
 
+@pytest.fixture(scope="class")
+def ro_config(tmp_path_factory):
+    """Shared, never-written ConfigManager for tests that only read defaults."""
+    return ConfigManager(str(tmp_path_factory.mktemp("cfg") / "data"))
+
+
 class TestConfigDefaults:
-    def test_defaults_applied(self, config):
-        assert config.get("modem_url") == "http://192.168.178.1"
-        assert config.get("poll_interval") == 900
-        assert config.get("web_port") == 8765
-        assert config.get("theme") == "dark"
-        assert config.get("language") == "en"
+    def test_defaults_applied(self, ro_config):
+        assert ro_config.get("modem_url") == "http://192.168.178.1"
+        assert ro_config.get("poll_interval") == 900
+        assert ro_config.get("web_port") == 8765
+        assert ro_config.get("theme") == "dark"
+        assert ro_config.get("language") == "en"
 
-    def test_custom_default(self, config):
-        assert config.get("nonexistent", "fallback") == "fallback"
+    def test_custom_default(self, ro_config):
+        assert ro_config.get("nonexistent", "fallback") == "fallback"
 
-    def test_not_configured_initially(self, config):
-        assert config.is_configured() is False
+    def test_not_configured_initially(self, ro_config):
+        assert ro_config.is_configured() is False
 
-    def test_mqtt_not_configured_initially(self, config):
-        assert config.is_mqtt_configured() is False
+    def test_mqtt_not_configured_initially(self, ro_config):
+        assert ro_config.is_mqtt_configured() is False
 
 
 class TestConfigSaveLoad:
@@ -48,6 +54,38 @@ class TestConfigSaveLoad:
         config.save({"modem_user": "test"})
         assert os.path.exists(os.path.join(tmp_data_dir, "config.json"))
 
+    def test_reload_picks_up_external_edit(self, config, tmp_data_dir):
+        config.save({"modem_user": "admin", "isp_name": "Vodafone"})
+        with open(os.path.join(tmp_data_dir, "config.json"), "w") as f:
+            json.dump({"modem_user": "other"}, f)
+        config.reload()
+        assert config.get("modem_user") == "other"
+        assert config.get("isp_name") == ""
+
+    def test_reload_keeps_old_values_while_reading(self, config, monkeypatch):
+        config.save({"modem_user": "admin"})
+        seen = []
+        orig_load = json.load
+
+        def spy_load(f):
+            seen.append(config.get("modem_user"))
+            return orig_load(f)
+
+        monkeypatch.setattr("app.config.json.load", spy_load)
+        config.reload()
+        assert seen == ["admin"]
+        assert config.get("modem_user") == "admin"
+
+    def test_batch_writes_once_on_exit(self, config, tmp_data_dir):
+        path = os.path.join(tmp_data_dir, "config.json")
+        with config.batch():
+            config.save({"modem_user": "admin"})
+            config.save({"poll_interval": 120})
+            assert not os.path.exists(path)
+        config.reload()
+        assert config.get("modem_user") == "admin"
+        assert config.get("poll_interval") == 120
+
     def test_int_keys_cast(self, tmp_data_dir):
         config = ConfigManager(tmp_data_dir)
         config.save({"poll_interval": "180"})
@@ -70,13 +108,15 @@ class TestConfigSecrets:
         config = ConfigManager(tmp_data_dir)
         config.save({"modem_password": "secret123"})
 
+        # A new instance must read the persisted key file to decrypt
         config2 = ConfigManager(tmp_data_dir)
         assert config2.get("modem_password") == "secret123"
 
     def test_mask_not_saved(self, tmp_data_dir):
         config = ConfigManager(tmp_data_dir)
-        config.save({"modem_password": "original"})
-        config.save({"modem_password": PASSWORD_MASK, "modem_user": "updated"})
+        with config.batch():
+            config.save({"modem_password": "original"})
+            config.save({"modem_password": PASSWORD_MASK, "modem_user": "updated"})
 
         config2 = ConfigManager(tmp_data_dir)
         assert config2.get("modem_password") == "original"
@@ -107,9 +147,11 @@ class TestConfigSecrets:
 
     def test_admin_password_mask_not_saved(self, tmp_data_dir):
         config = ConfigManager(tmp_data_dir)
-        config.save({"admin_password": "original"})
-        hash1 = config.get("admin_password")
-        config.save({"admin_password": PASSWORD_MASK, "modem_user": "updated"})
+        with config.batch():
+            config.save({"admin_password": "original"})
+            hash1 = config.get("admin_password")
+            config.save({"admin_password": PASSWORD_MASK, "modem_user": "updated"})
+        config.reload()
         assert config.get("admin_password") == hash1
 
     def test_admin_password_masked_in_get_all(self, config):
@@ -1,21 +1,37 @@
 """Tests for event detection, storage, and API endpoints."""
 
-import json
+import sqlite3
 import pytest
 from datetime import datetime, timedelta
 
 from app.storage import SnapshotStorage
 from app.event_detector import EventDetector
-from app.web import app, init_config, init_storage
-from app.config import ConfigManager
+from app.web import init_config, init_storage
 
 
 # ── Fixtures ──
 
+# Opaque "recent" timestamp for events; only test_event_cleanup needs real ages.
+_TS = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _event(timestamp, severity, event_type, message):
+    """Event dict in the shape SnapshotStorage.save_events expects."""
+    return {"timestamp": timestamp, "severity": severity,
+            "event_type": event_type, "message": message, "details": None}
+
+
+@pytest.fixture(scope="module")
+def _shared_storage():
+    """One in-memory database for the module; the schema is created once."""
+    return SnapshotStorage("file:events_test?mode=memory&cache=shared", max_days=7)
+
+
 @pytest.fixture
-def storage(tmp_path):
-    db_path = str(tmp_path / "test.db")
-    return SnapshotStorage(db_path, max_days=7)
+def storage(_shared_storage):
+    with sqlite3.connect(_shared_storage.db_path, uri=True) as conn:
+        conn.execute("DELETE FROM events")
+    return _shared_storage
 
 
 @pytest.fixture
@@ -23,20 +39,26 @@ def detector():
     return EventDetector()
 
 
+# Channel dicts are built once; EventDetector only reads them, so
+# _make_analysis hands out slices of these lists.
+_DS_CH_TEMPLATE = [{"channel_id": i, "power": 3.0, "modulation": "256QAM",
+                    "snr": 35.0, "correctable_errors": 10,
+                    "uncorrectable_errors": 5, "docsis_version": "3.0",
+                    "health": "good", "health_detail": "", "frequency": "602 MHz"}
+                   for i in range(1, 64)]
+_US_CH_TEMPLATE = [{"channel_id": i, "power": 42.0, "modulation": "64QAM",
+                    "multiplex": "ATDMA", "docsis_version": "3.0",
+                    "health": "good", "health_detail": "", "frequency": "37 MHz"}
+                   for i in range(1, 9)]
+
+
 def _make_analysis(health="good", ds_power_avg=2.5, us_power_avg=42.0,
                    ds_snr_min=35.0, ds_total=33, us_total=4,
                    ds_uncorrectable_errors=100, ds_channels=None, us_channels=None):
     if ds_channels is None:
-        ds_channels = [{"channel_id": i, "power": 3.0, "modulation": "256QAM",
-                        "snr": 35.0, "correctable_errors": 10,
-                        "uncorrectable_errors": 5, "docsis_version": "3.0",
-                        "health": "good", "health_detail": "", "frequency": "602 MHz"}
-                       for i in range(1, ds_total + 1)]
+        ds_channels = _DS_CH_TEMPLATE[:ds_total]
     if us_channels is None:
-        us_channels = [{"channel_id": i, "power": 42.0, "modulation": "64QAM",
-                        "multiplex": "ATDMA", "docsis_version": "3.0",
-                        "health": "good", "health_detail": "", "frequency": "37 MHz"}
-                       for i in range(1, us_total + 1)]
+        us_channels = _US_CH_TEMPLATE[:us_total]
     return {
         "summary": {
             "health": health,
@@ -59,12 +81,25 @@ def _make_analysis(health="good", ds_power_avg=2.5, us_power_avg=42.0,
     }
 
 
+@pytest.fixture(scope="class")
+def populated_storage():
+    """Read-only storage holding one info, one warning and one critical event."""
+    s = SnapshotStorage("file:events_populated?mode=memory&cache=shared", max_days=7)
+    s.save_events([
+        _event(_TS, "info", "channel_change", "Msg 1"),
+        _event(_TS, "warning", "power_change", "Msg 2"),
+        _event(_TS, "critical", "health_change", "Msg 3"),
+    ])
+    yield s
+    with sqlite3.connect(s.db_path, uri=True) as conn:
+        conn.execute("DELETE FROM events")
+
+
 # ── Storage Tests ──
 
 class TestEventStorage:
     def test_save_and_get_events(self, storage):
-        ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        eid = storage.save_event(ts, "warning", "power_change", "Power shifted", {"delta": 3.5})
+        eid = storage.save_event(_TS, "warning", "power_change", "Power shifted", {"delta": 3.5})
         assert eid is not None
         events = storage.get_events()
         assert len(events) == 1
@@ -74,38 +109,31 @@ class TestEventStorage:
         assert events[0]["acknowledged"] == 0
 
     def test_save_events_bulk(self, storage):
-        ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
         events_list = [
-            {"timestamp": ts, "severity": "info", "event_type": "channel_change",
+            {"timestamp": _TS, "severity": "info", "event_type": "channel_change",
              "message": "DS channels changed", "details": None},
-            {"timestamp": ts, "severity": "critical", "event_type": "health_change",
+            {"timestamp": _TS, "severity": "critical", "event_type": "health_change",
              "message": "Health degraded", "details": {"prev": "good", "current": "poor"}},
         ]
         count = storage.save_events(events_list)
         assert count == 2
         assert len(storage.get_events()) == 2
 
-    def test_get_events_with_filters(self, storage):
-        ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        storage.save_event(ts, "info", "channel_change", "Msg 1")
-        storage.save_event(ts, "warning", "power_change", "Msg 2")
-        storage.save_event(ts, "critical", "health_change", "Msg 3")
+    @pytest.mark.parametrize("filters,expected", [
+        ({"severity": "warning"}, 1),
+        ({"event_type": "health_change"}, 1),
+        ({"severity": "info"}, 1),
+        ({}, 3),
+    ])
+    def test_get_events_with_filters(self, populated_storage, filters, expected):
+        assert len(populated_storage.get_events(**filters)) == expected
 
-        assert len(storage.get_events(severity="warning")) == 1
-        assert len(storage.get_events(event_type="health_change")) == 1
-        assert len(storage.get_events(severity="info")) == 1
-
-    def test_event_count(self, storage):
-        ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        storage.save_event(ts, "info", "channel_change", "Msg")
-        storage.save_event(ts, "warning", "power_change", "Msg")
-        assert storage.get_event_count() == 2
-        assert storage.get_event_count(acknowledged=0) == 2
-        assert storage.get_event_count(acknowledged=1) == 0
+    @pytest.mark.parametrize("acknowledged,expected", [(None, 3), (0, 3), (1, 0)])
+    def test_event_count(self, populated_storage, acknowledged, expected):
+        assert populated_storage.get_event_count(acknowledged=acknowledged) == expected
 
     def test_acknowledge_event(self, storage):
-        ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        eid = storage.save_event(ts, "warning", "power_change", "Msg")
+        eid = storage.save_event(_TS, "warning", "power_change", "Msg")
         assert storage.acknowledge_event(eid)
         events = storage.get_events()
         assert events[0]["acknowledged"] == 1
@@ -116,29 +144,32 @@ class TestEventStorage:
         assert not storage.acknowledge_event(9999)
 
     def test_acknowledge_all(self, storage):
-        ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        storage.save_event(ts, "info", "channel_change", "Msg 1")
-        storage.save_event(ts, "warning", "power_change", "Msg 2")
+        storage.save_events([
+            _event(_TS, "info", "channel_change", "Msg 1"),
+            _event(_TS, "warning", "power_change", "Msg 2"),
+        ])
         count = storage.acknowledge_all_events()
         assert count == 2
         assert storage.get_event_count(acknowledged=0) == 0
 
-    def test_event_cleanup(self, tmp_path):
-        db_path = str(tmp_path / "cleanup.db")
-        s = SnapshotStorage(db_path, max_days=1)
+    def test_event_cleanup(self, storage):
         old_ts = (datetime.now() - timedelta(days=2)).strftime("%Y-%m-%dT%H:%M:%S")
         new_ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        s.save_event(old_ts, "info", "channel_change", "Old event")
-        s.save_event(new_ts, "info", "channel_change", "New event")
-        deleted = s.delete_old_events(1)
+        storage.save_events([
+            _event(old_ts, "info", "channel_change", "Old event"),
+            _event(new_ts, "info", "channel_change", "New event"),
+        ])
+        deleted = storage.delete_old_events(1)
         assert deleted == 1
-        assert len(s.get_events()) == 1
+        assert len(storage.get_events()) == 1
 
     def test_events_newest_first(self, storage):
         ts1 = "2026-01-01T00:00:00"
         ts2 = "2026-01-02T00:00:00"
-        storage.save_event(ts1, "info", "channel_change", "Older")
-        storage.save_event(ts2, "info", "channel_change", "Newer")
+        storage.save_events([
+            _event(ts1, "info", "channel_change", "Older"),
+            _event(ts2, "info", "channel_change", "Newer"),
+        ])
         events = storage.get_events()
         assert events[0]["timestamp"] == ts2
         assert events[1]["timestamp"] == ts1
@@ -164,42 +195,24 @@ class TestEventDetector:
         events = detector.check(analysis)
         assert events == []
 
-    def test_health_change_detected(self, detector):
-        detector.check(_make_analysis(health="good"))
-        events = detector.check(_make_analysis(health="poor"))
-        assert len(events) == 1
-        assert events[0]["event_type"] == "health_change"
-        assert events[0]["severity"] == "critical"
-        assert "good" in events[0]["message"]
-        assert "poor" in events[0]["message"]
-
-    def test_health_recovery_detected(self, detector):
-        detector.check(_make_analysis(health="poor"))
-        events = detector.check(_make_analysis(health="good"))
-        assert len(events) == 1
-        assert events[0]["event_type"] == "health_change"
-        assert events[0]["severity"] == "info"
-
-    def test_health_marginal_warning(self, detector):
-        detector.check(_make_analysis(health="good"))
-        events = detector.check(_make_analysis(health="marginal"))
+    @pytest.mark.parametrize("before,after,event_type,severity,fragments", [
+        ({"health": "good"}, {"health": "poor"}, "health_change", "critical", ("good", "poor")),
+        ({"health": "poor"}, {"health": "good"}, "health_change", "info", ()),
+        ({"health": "good"}, {"health": "marginal"}, "health_change", "warning", ()),
+        ({"ds_power_avg": 2.5}, {"ds_power_avg": 5.0}, "power_change", "warning", ("DS",)),
+        ({"us_power_avg": 42.0}, {"us_power_avg": 45.5}, "power_change", "warning", ("US",)),
+        ({"ds_snr_min": 35.0}, {"ds_snr_min": 31.0}, "snr_change", "warning", ()),
+        ({"ds_snr_min": 31.0}, {"ds_snr_min": 27.0}, "snr_change", "critical", ()),
+    ], ids=["health_degraded", "health_recovered", "health_marginal", "ds_power",
+            "us_power", "snr_warning", "snr_critical"])
+    def test_change_detected(self, detector, before, after, event_type, severity, fragments):
+        detector.check(_make_analysis(**before))
+        events = detector.check(_make_analysis(**after))
         assert len(events) == 1
-        assert events[0]["severity"] == "warning"
-
-    def test_power_change_detected(self, detector):
-        detector.check(_make_analysis(ds_power_avg=2.5))
-        events = detector.check(_make_analysis(ds_power_avg=5.0))
-        power_events = [e for e in events if e["event_type"] == "power_change"]
-        assert len(power_events) == 1
-        assert power_events[0]["severity"] == "warning"
-        assert "DS" in power_events[0]["message"]
-
-    def test_us_power_change_detected(self, detector):
-        detector.check(_make_analysis(us_power_avg=42.0))
-        events = detector.check(_make_analysis(us_power_avg=45.5))
-        power_events = [e for e in events if e["event_type"] == "power_change"]
-        assert len(power_events) == 1
-        assert "US" in power_events[0]["message"]
+        assert events[0]["event_type"] == event_type
+        assert events[0]["severity"] == severity
+        for fragment in fragments:
+            assert fragment in events[0]["message"]
 
     def test_power_no_event_small_shift(self, detector):
         detector.check(_make_analysis(ds_power_avg=2.5))
@@ -207,20 +220,6 @@ class TestEventDetector:
         power_events = [e for e in events if e["event_type"] == "power_change"]
         assert len(power_events) == 0
 
-    def test_snr_drop_warning(self, detector):
-        detector.check(_make_analysis(ds_snr_min=35.0))
-        events = detector.check(_make_analysis(ds_snr_min=31.0))
-        snr_events = [e for e in events if e["event_type"] == "snr_change"]
-        assert len(snr_events) == 1
-        assert snr_events[0]["severity"] == "warning"
-
-    def test_snr_drop_critical(self, detector):
-        detector.check(_make_analysis(ds_snr_min=31.0))
-        events = detector.check(_make_analysis(ds_snr_min=27.0))
-        snr_events = [e for e in events if e["event_type"] == "snr_change"]
-        assert len(snr_events) == 1
-        assert snr_events[0]["severity"] == "critical"
-
     def test_channel_count_change(self, detector):
         detector.check(_make_analysis(ds_total=33, us_total=4))
         events = detector.check(_make_analysis(ds_total=30, us_total=4))
@@ -299,54 +298,48 @@ class TestEventDetector:
 # ── API Tests ──
 
 @pytest.fixture
-def api_storage(tmp_path):
-    db_path = str(tmp_path / "api_test.db")
-    return SnapshotStorage(db_path, max_days=7)
+def api_storage(storage):
+    return storage
 
 
 @pytest.fixture
-def client(tmp_path, api_storage):
-    data_dir = str(tmp_path / "data")
-    mgr = ConfigManager(data_dir)
-    mgr.save({"modem_password": "test"})
+def client(web_env, api_storage):
+    c, mgr = web_env
     init_config(mgr)
     init_storage(api_storage)
-    app.config["TESTING"] = True
-    with app.test_client() as client:
-        yield client
+    return c
 
 
 class TestEventsAPI:
     def test_get_events_empty(self, client):
         resp = client.get("/api/events")
         assert resp.status_code == 200
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert data["events"] == []
         assert data["unacknowledged_count"] == 0
 
     def test_get_events_with_data(self, client, api_storage):
-        ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        api_storage.save_event(ts, "warning", "power_change", "Power shifted")
+        api_storage.save_event(_TS, "warning", "power_change", "Power shifted")
         resp = client.get("/api/events")
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert len(data["events"]) == 1
         assert data["unacknowledged_count"] == 1
 
     def test_get_events_with_filters(self, client, api_storage):
-        ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        api_storage.save_event(ts, "info", "channel_change", "Msg 1")
-        api_storage.save_event(ts, "warning", "power_change", "Msg 2")
+        api_storage.save_events([
+            _event(_TS, "info", "channel_change", "Msg 1"),
+            _event(_TS, "warning", "power_change", "Msg 2"),
+        ])
         resp = client.get("/api/events?severity=warning")
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert len(data["events"]) == 1
         assert data["events"][0]["severity"] == "warning"
 
     def test_acknowledge_event(self, client, api_storage):
-        ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        eid = api_storage.save_event(ts, "warning", "power_change", "Msg")
+        eid = api_storage.save_event(_TS, "warning", "power_change", "Msg")
         resp = client.post(f"/api/events/{eid}/acknowledge")
         assert resp.status_code == 200
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert data["success"] is True
 
     def test_acknowledge_nonexistent(self, client):
@@ -354,24 +347,35 @@ class TestEventsAPI:
         assert resp.status_code == 404
 
     def test_acknowledge_all(self, client, api_storage):
-        ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        api_storage.save_event(ts, "info", "channel_change", "Msg 1")
-        api_storage.save_event(ts, "warning", "power_change", "Msg 2")
+        api_storage.save_events([
+            _event(_TS, "info", "channel_change", "Msg 1"),
+            _event(_TS, "warning", "power_change", "Msg 2"),
+        ])
         resp = client.post("/api/events/acknowledge-all")
         assert resp.status_code == 200
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert data["success"] is True
         assert data["count"] == 2
 
     def test_events_count(self, client, api_storage):
-        ts = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-        api_storage.save_event(ts, "warning", "power_change", "Msg")
+        api_storage.save_event(_TS, "warning", "power_change", "Msg")
         resp = client.get("/api/events/count")
         assert resp.status_code == 200
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert data["count"] == 1
 
     def test_events_count_empty(self, client):
         resp = client.get("/api/events/count")
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert data["count"] == 0
+
+    def test_get_events_limit_clamped(self, client, api_storage):
+        api_storage.save_events([
+            _event(_TS, "info", "channel_change", "Msg 1"),
+            _event(_TS, "warning", "power_change", "Msg 2"),
+        ])
+        # limit=0 is clamped to 1, negative offset to 0
+        resp = client.get("/api/events?limit=0&offset=-5")
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert len(data["events"]) == 1
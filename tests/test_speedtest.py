@@ -1,10 +1,12 @@
 """Tests for Speedtest Tracker client and API endpoint."""
 
 import pytest
-from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import MagicMock
 
+import app.speedtest as speedtest_module
 from app.speedtest import SpeedtestClient
-from app.web import app, init_config, init_storage
+from app.web import init_config, init_storage
 from app.config import ConfigManager
 
 
@@ -45,22 +47,33 @@ SAMPLE_API_RESPONSE = {
 }
 
 
+def _json_response(payload):
+    """Stand-in requests response; the client only calls json() and raise_for_status()."""
+    return SimpleNamespace(json=lambda: payload, raise_for_status=lambda: None)
+
+
 # ── Client Tests ──
 
 
-class TestSpeedtestClient:
-    def _make_client(self):
-        return SpeedtestClient("http://speedtest.local:8999", "test-token")
+@pytest.fixture
+def mock_get(monkeypatch):
+    """Replace requests.Session.get for the test with a plain attribute swap."""
+    get = MagicMock()
+    monkeypatch.setattr(speedtest_module.requests.Session, "get", get)
+    return get
+
+
+@pytest.fixture(scope="module")
+def speedtest():
+    """One client for the module; requests are mocked at Session.get."""
+    return SpeedtestClient("http://speedtest.local:8999", "test-token")
+
 
-    @patch("app.speedtest.requests.Session.get")
-    def test_get_latest_success(self, mock_get):
-        mock_resp = MagicMock()
-        mock_resp.json.return_value = {"data": [SAMPLE_RESULT]}
-        mock_resp.raise_for_status = MagicMock()
-        mock_get.return_value = mock_resp
+class TestSpeedtestClient:
+    def test_get_latest_success(self, mock_get, speedtest):
+        mock_get.return_value = _json_response({"data": [SAMPLE_RESULT]})
 
-        client = self._make_client()
-        results = client.get_latest(1)
+        results = speedtest.get_latest(1)
 
         assert len(results) == 1
         r = results[0]
@@ -72,34 +85,22 @@ class TestSpeedtestClient:
         assert r["download_human"] == "1.10 Gbps"
         assert r["timestamp"] == "2025-01-15T10:30:00Z"
 
-    @patch("app.speedtest.requests.Session.get")
-    def test_get_latest_empty(self, mock_get):
-        mock_resp = MagicMock()
-        mock_resp.json.return_value = {"data": []}
-        mock_resp.raise_for_status = MagicMock()
-        mock_get.return_value = mock_resp
+    def test_get_latest_empty(self, mock_get, speedtest):
+        mock_get.return_value = _json_response({"data": []})
 
-        client = self._make_client()
-        results = client.get_latest(1)
+        results = speedtest.get_latest(1)
         assert results == []
 
-    @patch("app.speedtest.requests.Session.get")
-    def test_get_latest_connection_error(self, mock_get):
+    def test_get_latest_connection_error(self, mock_get, speedtest):
         mock_get.side_effect = Exception("Connection refused")
 
-        client = self._make_client()
-        results = client.get_latest(1)
+        results = speedtest.get_latest(1)
         assert results == []
 
-    @patch("app.speedtest.requests.Session.get")
-    def test_get_results_pagination(self, mock_get):
-        mock_resp = MagicMock()
-        mock_resp.json.return_value = {**SAMPLE_API_RESPONSE, "meta": {"last_page": 1}}
-        mock_resp.raise_for_status = MagicMock()
-        mock_get.return_value = mock_resp
+    def test_get_results_pagination(self, mock_get, speedtest):
+        mock_get.return_value = _json_response({**SAMPLE_API_RESPONSE, "meta": {"last_page": 1}})
 
-        client = self._make_client()
-        results = client.get_results(per_page=100)
+        results = speedtest.get_results(per_page=100)
 
         assert len(results) == 2
         call_kwargs = mock_get.call_args
@@ -107,24 +108,17 @@ class TestSpeedtestClient:
         assert params["page[size]"] == 100
         assert params["page[number]"] == 1
 
-    @patch("app.speedtest.requests.Session.get")
-    def test_get_results_connection_error(self, mock_get):
+    def test_get_results_connection_error(self, mock_get, speedtest):
         mock_get.side_effect = Exception("Timeout")
 
-        client = self._make_client()
-        results = client.get_results()
+        results = speedtest.get_results()
         assert results == []
 
-    @patch("app.speedtest.requests.Session.get")
-    def test_parse_minimal_result(self, mock_get):
+    def test_parse_minimal_result(self, mock_get, speedtest):
         """Result with empty data dict should not crash."""
-        mock_resp = MagicMock()
-        mock_resp.json.return_value = {"data": [SAMPLE_RESULT_MINIMAL]}
-        mock_resp.raise_for_status = MagicMock()
-        mock_get.return_value = mock_resp
+        mock_get.return_value = _json_response({"data": [SAMPLE_RESULT_MINIMAL]})
 
-        client = self._make_client()
-        results = client.get_latest(1)
+        results = speedtest.get_latest(1)
 
         assert len(results) == 1
         r = results[0]
@@ -132,10 +126,9 @@ class TestSpeedtestClient:
         assert r["jitter_ms"] == 0
         assert r["packet_loss_pct"] == 0
 
-    def test_auth_headers(self):
-        client = self._make_client()
-        assert client.session.headers["Authorization"] == "Bearer test-token"
-        assert client.session.headers["Accept"] == "application/json"
+    def test_auth_headers(self, speedtest):
+        assert speedtest.session.headers["Authorization"] == "Bearer test-token"
+        assert speedtest.session.headers["Accept"] == "application/json"
 
     def test_url_trailing_slash(self):
         client = SpeedtestClient("http://example.com:8999/", "tok")
@@ -176,36 +169,35 @@ class TestSpeedtestConfig:
         with open(mgr.config_path) as f:
             raw = json.load(f)
         assert raw["speedtest_tracker_token"] != "my-secret-token"
-        # But get() returns decrypted
+        # But get() returns decrypted, also from a new instance
         assert mgr.get("speedtest_tracker_token") == "my-secret-token"
+        assert ConfigManager(mgr.data_dir).get("speedtest_tracker_token") == "my-secret-token"
 
 
 # ── API Tests ──
 
 
+@pytest.fixture(scope="class")
+def web_config_values(request):
+    """Only TestSpeedtestAPI has a Speedtest Tracker configured."""
+    values = {"modem_password": "test"}
+    if request.cls is TestSpeedtestAPI:
+        values["speedtest_tracker_url"] = "http://speedtest.local:8999"
+        values["speedtest_tracker_token"] = "test-token"
+    return values
+
+
 @pytest.fixture
-def speedtest_client(tmp_path):
-    data_dir = str(tmp_path / "data")
-    mgr = ConfigManager(data_dir)
-    mgr.save({
-        "modem_password": "test",
-        "speedtest_tracker_url": "http://speedtest.local:8999",
-        "speedtest_tracker_token": "test-token",
-    })
+def speedtest_client(web_env):
+    client, mgr = web_env
     init_config(mgr)
     init_storage(None)
-    app.config["TESTING"] = True
-    with app.test_client() as client:
-        yield client
+    return client
 
 
 class TestSpeedtestAPI:
-    @patch("app.speedtest.requests.Session.get")
     def test_api_speedtest(self, mock_get, speedtest_client):
-        mock_resp = MagicMock()
-        mock_resp.json.return_value = {"data": [SAMPLE_RESULT]}
-        mock_resp.raise_for_status = MagicMock()
-        mock_get.return_value = mock_resp
+        mock_get.return_value = _json_response({"data": [SAMPLE_RESULT]})
 
         resp = speedtest_client.get("/api/speedtest?days=7")
         assert resp.status_code == 200
@@ -214,14 +206,9 @@ class TestSpeedtestAPI:
         assert data[0]["download_mbps"] == 1100.0
         assert data[0]["ping_ms"] == 12.5
 
-    def test_api_speedtest_not_configured(self, tmp_path):
-        data_dir = str(tmp_path / "data2")
-        mgr = ConfigManager(data_dir)
-        mgr.save({"modem_password": "test"})
-        init_config(mgr)
-        init_storage(None)
-        app.config["TESTING"] = True
-        with app.test_client() as client:
-            resp = client.get("/api/speedtest?days=7")
-            assert resp.status_code == 200
-            assert resp.get_json() == []
+
+class TestSpeedtestAPINotConfigured:
+    def test_api_speedtest_not_configured(self, speedtest_client):
+        resp = speedtest_client.get("/api/speedtest?days=7")
+        assert resp.status_code == 200
+        assert resp.get_json() == []
@@ -53,10 +53,26 @@ class TestSnapshotStorage:
         assert len(intraday) >= 1
         assert "health" in intraday[0]
 
+    def test_list_json_cached_until_write(self, storage, sample_analysis):
+        import json
+        assert storage.get_snapshot_list_json() == b"[]"
+        assert storage.get_dates_with_data_json() == b"[]"
+        storage.save_snapshot(sample_analysis)
+        assert json.loads(storage.get_snapshot_list_json()) == storage.get_snapshot_list()
+        assert json.loads(storage.get_dates_with_data_json()) == storage.get_dates_with_data()
+        assert storage.get_snapshot_list_json() is storage.get_snapshot_list_json()
+
     def test_empty_storage(self, storage):
         assert storage.get_snapshot_list() == []
         assert storage.get_dates_with_data() == []
 
+    def test_in_memory_uri(self, sample_analysis):
+        s = SnapshotStorage("file:storage_uri_test?mode=memory&cache=shared")
+        s.save_snapshot(sample_analysis)
+        assert len(s.get_snapshot_list()) == 1
+        s.save_incident("2026-01-01", "Outage", "")
+        assert len(s.get_incidents()) == 1
+
     def test_unlimited_retention(self, tmp_path, sample_analysis):
         """max_days=0 should keep all snapshots (no cleanup)."""
         db_path = str(tmp_path / "unlimited.db")
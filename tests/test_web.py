@@ -1,146 +1,306 @@
 """Tests for Flask web routes and API endpoints."""
 
+import dataclasses
 import json
+import time
+
 import pytest
-from app.web import app, update_state, init_config, init_storage
+import app.web as web_module
+from app.web import (
+    app, update_state, init_config, init_storage, State, format_k,
+    _cfg, _get_lang, _is_valid_date, _is_valid_ts,
+)
 from app.config import ConfigManager
+from app.storage import SnapshotStorage
+
+
+# The config manager and test client come from web_env, built once per
+# class; the autouse fixture below puts back everything a test may have changed.
+
+@pytest.fixture(scope="class")
+def web_config_values():
+    return {"modem_password": "test", "isp_name": "Vodafone"}
 
 
 @pytest.fixture
-def config_mgr(tmp_path):
-    data_dir = str(tmp_path / "data")
-    mgr = ConfigManager(data_dir)
-    mgr.save({"modem_password": "test", "isp_name": "Vodafone"})
-    return mgr
+def config_mgr(web_env):
+    return web_env[1]
 
 
 @pytest.fixture
-def client(config_mgr):
-    init_config(config_mgr)
+def client(web_env):
+    c, mgr = web_env
+    init_config(mgr)
     init_storage(None)
-    app.config["TESTING"] = True
-    with app.test_client() as client:
-        yield client
+    c.delete_cookie("session")
+    return c
 
 
 @pytest.fixture
-def sample_analysis():
-    return {
-        "summary": {
-            "ds_total": 33,
-            "us_total": 4,
-            "ds_power_min": -1.0,
-            "ds_power_max": 5.0,
-            "ds_power_avg": 2.5,
-            "us_power_min": 40.0,
-            "us_power_max": 45.0,
-            "us_power_avg": 42.5,
-            "ds_snr_min": 35.0,
-            "ds_snr_avg": 37.0,
-            "ds_correctable_errors": 1234,
-            "ds_uncorrectable_errors": 56,
+def unconfigured_client(web_env, tmp_path):
+    """Client bound to an empty config (no modem password)."""
+    c, _ = web_env
+    init_config(ConfigManager(str(tmp_path / "unconfigured")))
+    init_storage(None)
+    c.delete_cookie("session")
+    return c
+
+
+@pytest.fixture(autouse=True)
+def _reset_web_state(config_mgr, monkeypatch):
+    """Fresh web State and poll limiter per test; config.json restored afterwards."""
+    with open(config_mgr.config_path) as f:
+        baseline = f.read()
+    monkeypatch.setattr(web_module, "_state", State())
+    monkeypatch.setattr(web_module, "_last_manual_poll", 0.0)
+    yield
+    with open(config_mgr.config_path, "w") as f:
+        f.write(baseline)
+    config_mgr.reload()
+
+
+_SAMPLE_ANALYSIS = {
+    "summary": {
+        "ds_total": 33,
+        "us_total": 4,
+        "ds_power_min": -1.0,
+        "ds_power_max": 5.0,
+        "ds_power_avg": 2.5,
+        "us_power_min": 40.0,
+        "us_power_max": 45.0,
+        "us_power_avg": 42.5,
+        "ds_snr_min": 35.0,
+        "ds_snr_avg": 37.0,
+        "ds_correctable_errors": 1234,
+        "ds_uncorrectable_errors": 56,
+        "health": "good",
+        "health_issues": [],
+    },
+    "ds_channels": [
+        {
+            "channel_id": 1,
+            "frequency": "602 MHz",
+            "power": 3.0,
+            "snr": 35.0,
+            "modulation": "256QAM",
+            "correctable_errors": 100,
+            "uncorrectable_errors": 5,
+            "docsis_version": "3.0",
             "health": "good",
-            "health_issues": [],
-        },
-        "ds_channels": [
-            {
-                "channel_id": 1,
-                "frequency": "602 MHz",
-                "power": 3.0,
-                "snr": 35.0,
-                "modulation": "256QAM",
-                "correctable_errors": 100,
-                "uncorrectable_errors": 5,
-                "docsis_version": "3.0",
-                "health": "good",
-                "health_detail": "",
-            }
-        ],
-        "us_channels": [
-            {
-                "channel_id": 1,
-                "frequency": "37 MHz",
-                "power": 42.0,
-                "modulation": "64QAM",
-                "multiplex": "ATDMA",
-                "docsis_version": "3.0",
-                "health": "good",
-                "health_detail": "",
-            }
-        ],
-    }
+            "health_detail": "",
+        }
+    ],
+    "us_channels": [
+        {
+            "channel_id": 1,
+            "frequency": "37 MHz",
+            "power": 42.0,
+            "modulation": "64QAM",
+            "multiplex": "ATDMA",
+            "docsis_version": "3.0",
+            "health": "good",
+            "health_detail": "",
+        }
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def sample_analysis():
+    """Shared, read-only: tests that need a variant build their own copy."""
+    return _SAMPLE_ANALYSIS
+
+
+@pytest.fixture
+def analysis_loaded(client, sample_analysis):
+    """Publish the sample analysis as live state; _reset_web_state undoes it.
+
+    Depends on client so init_config (which drops the export cache) runs first.
+    """
+    update_state(analysis=sample_analysis)
+    return sample_analysis
 
 
 class TestIndexRoute:
-    def test_redirect_to_setup_when_unconfigured(self, tmp_path):
-        mgr = ConfigManager(str(tmp_path / "data2"))
-        init_config(mgr)
-        app.config["TESTING"] = True
-        with app.test_client() as c:
-            resp = c.get("/")
-            assert resp.status_code == 302
-            assert "/setup" in resp.headers["Location"]
-
-    def test_index_renders(self, client, sample_analysis):
-        update_state(analysis=sample_analysis)
+    def test_redirect_to_setup_when_unconfigured(self, unconfigured_client):
+        resp = unconfigured_client.get("/")
+        assert resp.status_code == 302
+        assert "/setup" in resp.headers["Location"]
+
+    @pytest.mark.usefixtures("analysis_loaded")
+    def test_index_renders(self, client):
         resp = client.get("/")
         assert resp.status_code == 200
         assert b"DOCSight" in resp.data
 
-    def test_index_with_lang(self, client, sample_analysis):
-        update_state(analysis=sample_analysis)
+    @pytest.mark.usefixtures("analysis_loaded")
+    def test_index_with_lang(self, client):
         resp = client.get("/?lang=de")
         assert resp.status_code == 200
 
 
+@pytest.mark.usefixtures("client")
+class TestRequestMemo:
+    def test_lang_memoized_per_request(self, config_mgr):
+        with app.test_request_context("/?lang=de"):
+            assert _get_lang() == "de"
+            config_mgr.save({"language": "fr"})
+            assert _get_lang() == "de"
+        with app.test_request_context("/"):
+            assert _get_lang() == "fr"
+
+    def test_cfg_memoized_per_request(self, config_mgr):
+        with app.test_request_context("/"):
+            assert _cfg("isp_name", "") == "Vodafone"
+            config_mgr.save({"isp_name": "Telekom"})
+            assert _cfg("isp_name", "") == "Vodafone"
+        with app.test_request_context("/"):
+            assert _cfg("isp_name", "") == "Telekom"
+
+
 class TestHealthEndpoint:
     def test_health_waiting(self, client):
-        update_state(analysis=None)
-        # Reset state
-        from app.web import _state
-        _state["analysis"] = None
         resp = client.get("/health")
         assert resp.status_code == 200
         assert resp.get_json()["docsis_health"] == "waiting"
 
-    def test_health_ok(self, client, sample_analysis):
-        update_state(analysis=sample_analysis)
+    @pytest.mark.usefixtures("analysis_loaded")
+    def test_health_ok(self, client):
         resp = client.get("/health")
         assert resp.status_code == 200
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert data["status"] == "ok"
         assert data["docsis_health"] == "good"
 
 
 class TestExportEndpoint:
     def test_export_no_data(self, client):
-        from app.web import _state
-        _state["analysis"] = None
         resp = client.get("/api/export")
         assert resp.status_code == 404
 
-    def test_export_returns_markdown(self, client, sample_analysis):
-        update_state(analysis=sample_analysis)
+    @pytest.mark.usefixtures("analysis_loaded")
+    def test_export_returns_markdown(self, client):
         resp = client.get("/api/export")
         assert resp.status_code == 200
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert "DOCSight" in data["text"]
         assert "DOCSIS" in data["text"]
         assert "Vodafone" in data["text"]
 
+    def test_export_optional_lines(self, client, sample_analysis):
+        analysis = {**sample_analysis,
+                    "summary": {**sample_analysis["summary"], "health_issues": ["ds_power_low"]}}
+        update_state(analysis=analysis, connection_info={
+            "max_downstream_kbps": 250000, "max_upstream_kbps": 50000})
+        text = client.get("/api/export").get_json()["text"]
+        assert "- **Tariff**: 250/50 Mbit/s (Down/Up)\n" in text
+        assert "- **Issues**: ds_power_low\n" in text
+        assert "| 1 | 602 MHz | 3.0 | 35.0 | 256QAM | 100 | 5 | 3.0 | good |" in text
+        assert text.endswith("4. Specific recommendations to improve connection quality")
+
+    @pytest.mark.usefixtures("analysis_loaded")
+    def test_export_prerendered_on_update(self, client):
+        entry = web_module._export_cache["entry"]
+        assert entry[0] is web_module._state
+        update_state(poll_interval=600)
+        assert web_module._export_cache["entry"][1] is entry[1]
+        assert client.get("/api/export").data == entry[1].encode()
+
+    @pytest.mark.usefixtures("analysis_loaded")
+    def test_export_compressed(self, client):
+        resp = client.get("/api/export", headers={"Accept-Encoding": "gzip"})
+        assert resp.status_code == 200
+        assert resp.headers["Content-Encoding"] == "gzip"
+
+    def test_export_cached_until_update(self, client, analysis_loaded):
+        first = client.get("/api/export").data
+        assert client.get("/api/export").data == first
+        update_state(analysis={**analysis_loaded,
+                               "summary": {**analysis_loaded["summary"], "health": "poor"}})
+        assert "**Health**: poor" in client.get("/api/export").get_json()["text"]
+
+
+class TestReportEndpoint:
+    def test_report_no_data(self, client):
+        resp = client.get("/api/report")
+        assert resp.status_code == 404
+
+    @pytest.mark.usefixtures("analysis_loaded")
+    def test_report_job_returns_pdf(self, client):
+        resp = client.get("/api/report?days=7")
+        assert resp.status_code == 202
+        job_id = resp.get_json()["job_id"]
+        # Wait for the background job, then fetch the result
+        web_module._report_jobs[job_id][0].result(timeout=30)
+        resp = client.get(f"/api/report/{job_id}")
+        assert resp.status_code == 200
+        assert resp.headers["Content-Type"] == "application/pdf"
+        assert resp.data[:5] == b"%PDF-"
+        # Result is handed out once
+        assert client.get(f"/api/report/{job_id}").status_code == 404
+
+    def test_report_unknown_job(self, client):
+        resp = client.get("/api/report/doesnotexist")
+        assert resp.status_code == 404
+
+
+class TestTrendsEndpoint:
+    def test_day_trends_streamed(self, client, tmp_path, sample_analysis):
+        storage = SnapshotStorage(str(tmp_path / "trends.db"))
+        storage.save_snapshot(sample_analysis)
+        storage.save_snapshot(sample_analysis)
+        date = storage.get_snapshot_list()[0][:10]
+        init_storage(storage)
+        try:
+            resp = client.get(f"/api/trends?range=day&date={date}")
+            assert resp.is_streamed
+            data = resp.get_json()
+            assert len(data) == 2
+            assert data[0]["health"] == "good"
+            # Same bytes as jsonify() of the whole list
+            assert resp.data == app.json.dumps(list(storage.iter_intraday_data(date))).encode()
+            assert client.get("/api/trends?range=day&date=2000-01-01").get_json() == []
+        finally:
+            init_storage(None)
+
 
 class TestCalendarEndpoint:
     def test_calendar_no_storage(self, client):
         resp = client.get("/api/calendar")
         assert resp.status_code == 200
-        assert json.loads(resp.data) == []
+        assert resp.get_json() == []
 
 
 class TestSnapshotsEndpoint:
     def test_snapshots_no_storage(self, client):
         resp = client.get("/api/snapshots")
         assert resp.status_code == 200
-        assert json.loads(resp.data) == []
+        assert resp.get_json() == []
+
+
+class TestChangelogEndpoint:
+    def test_changelog_returns_json(self, client):
+        resp = client.get("/api/changelog")
+        assert resp.status_code == 200
+        assert isinstance(resp.get_json(), list)
+        assert resp.headers["ETag"]
+        assert "max-age=300" in resp.headers["Cache-Control"]
+
+    def test_changelog_not_modified(self, client):
+        etag = client.get("/api/changelog").headers["ETag"]
+        resp = client.get("/api/changelog", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.data == b""
+
+
+class TestJSONProvider:
+    def test_provider_handles_non_str_keys(self):
+        assert json.loads(app.json.dumps({1: "a"})) == {"1": "a"}
+
+    def test_jsonify_roundtrip(self, client):
+        resp = client.get("/health")
+        assert resp.mimetype == "application/json"
+        assert resp.get_json()["status"] == "ok"
 
 
 class TestSetupRoute:
@@ -149,14 +309,10 @@ class TestSetupRoute:
         assert resp.status_code == 302
         assert "/" == resp.headers["Location"]
 
-    def test_setup_renders_when_unconfigured(self, tmp_path):
-        mgr = ConfigManager(str(tmp_path / "data3"))
-        init_config(mgr)
-        app.config["TESTING"] = True
-        with app.test_client() as c:
-            resp = c.get("/setup")
-            assert resp.status_code == 200
-            assert b"DOCSight" in resp.data
+    def test_setup_renders_when_unconfigured(self, unconfigured_client):
+        resp = unconfigured_client.get("/setup")
+        assert resp.status_code == 200
+        assert b"DOCSight" in resp.data
 
 
 class TestSettingsRoute:
@@ -167,114 +323,165 @@ class TestSettingsRoute:
 
 class TestConfigAPI:
     def test_save_config(self, client):
-        resp = client.post(
-            "/api/config",
-            data=json.dumps({"poll_interval": 120}),
-            content_type="application/json",
-        )
+        resp = client.post("/api/config", json={"poll_interval": 120})
         assert resp.status_code == 200
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert data["success"] is True
 
     def test_save_clamps_poll_interval(self, client):
-        resp = client.post(
-            "/api/config",
-            data=json.dumps({"poll_interval": 10}),
-            content_type="application/json",
-        )
-        assert json.loads(resp.data)["success"] is True
+        resp = client.post("/api/config", json={"poll_interval": 10})
+        assert resp.get_json()["success"] is True
 
     def test_save_no_data(self, client):
         resp = client.post("/api/config", content_type="application/json")
         assert resp.status_code in (400, 500)
 
+    def test_save_malformed_body(self, client):
+        resp = client.post("/api/config", data="{not json", content_type="application/json")
+        assert resp.status_code == 400
+        assert resp.get_json()["error"] == "No data"
+
+    def test_test_modem_no_data(self, client):
+        resp = client.post("/api/test-modem", data="garbage", content_type="text/plain")
+        assert resp.get_json() == {"success": False, "error": "No data"}
+
 
 class TestSecurityHeaders:
-    def test_headers_present(self, client, sample_analysis):
-        update_state(analysis=sample_analysis)
+    @pytest.mark.usefixtures("analysis_loaded")
+    def test_headers_present(self, client):
         resp = client.get("/")
-        assert resp.headers["X-Content-Type-Options"] == "nosniff"
-        assert resp.headers["X-Frame-Options"] == "DENY"
-        assert resp.headers["X-XSS-Protection"] == "1; mode=block"
-        assert resp.headers["Referrer-Policy"] == "strict-origin-when-cross-origin"
+        expected = {
+            "X-Content-Type-Options": "nosniff",
+            "X-Frame-Options": "DENY",
+            "X-XSS-Protection": "1; mode=block",
+            "Referrer-Policy": "strict-origin-when-cross-origin",
+        }
+        assert {k: resp.headers.get(k) for k in expected} == expected
 
     def test_headers_on_health(self, client):
         resp = client.get("/health")
         assert resp.headers["X-Content-Type-Options"] == "nosniff"
 
+    def test_headers_not_duplicated(self, client):
+        resp = client.get("/api/changelog")
+        for name in ("X-Content-Type-Options", "X-Frame-Options", "X-XSS-Protection", "Referrer-Policy"):
+            assert len(resp.headers.getlist(name)) == 1
+
 
 class TestTimestampValidation:
-    def test_invalid_timestamp_rejected(self, client, sample_analysis):
-        update_state(analysis=sample_analysis)
+    @pytest.mark.usefixtures("analysis_loaded")
+    def test_invalid_timestamp_rejected(self, client):
         resp = client.get("/?t=../../etc/passwd")
         assert resp.status_code == 302
         assert resp.headers["Location"] == "/"
 
-    def test_valid_timestamp_accepted(self, client, sample_analysis):
-        update_state(analysis=sample_analysis)
+    @pytest.mark.usefixtures("analysis_loaded")
+    def test_valid_timestamp_accepted(self, client):
         # No storage, so snapshot lookup returns None and falls through to live view
         resp = client.get("/?t=2026-01-01T06:00:00")
         assert resp.status_code == 200
 
+    def test_shape_helpers(self):
+        assert _is_valid_ts("2026-01-01T06:00:00")
+        assert not _is_valid_ts("2026-01-01 06:00:00")
+        assert _is_valid_date("2026-01-01")
+        assert not _is_valid_date("2026-1-01")
+
+    @pytest.mark.parametrize("value", [
+        "2026-01-01T06:00:00\n",
+        "\uff12\uff10\uff12\uff16-01-01T06:00:00",  # fullwidth digits
+        "\u0662\u0660\u0662\u0666-01-01T06:00:00",  # Arabic-Indic digits
+    ])
+    def test_shape_helpers_ascii_only(self, value):
+        assert not _is_valid_ts(value)
+        assert not _is_valid_date(value[:10] + value[19:])
+
 
 class TestSessionKeyPersistence:
     def test_session_key_file_created(self, tmp_path):
-        data_dir = str(tmp_path / "data_sk")
-        mgr = ConfigManager(data_dir)
-        init_config(mgr)
-        import os
-        assert os.path.exists(os.path.join(data_dir, ".session_key"))
+        key_path = tmp_path / "data_sk" / ".session_key"
+        init_config(ConfigManager(str(key_path.parent)))
+        assert key_path.is_file()
 
     def test_session_key_persisted(self, tmp_path):
-        data_dir = str(tmp_path / "data_sk2")
-        mgr = ConfigManager(data_dir)
+        mgr = ConfigManager(str(tmp_path / "data_sk2"))
         init_config(mgr)
         key1 = app.secret_key
         # Re-init should load same key
         init_config(mgr)
         assert app.secret_key == key1
 
+    def test_signing_serializer_cached_per_key(self, tmp_path):
+        init_config(ConfigManager(str(tmp_path / "data_sk3")))
+        iface = app.session_interface
+        first = iface.get_signing_serializer(app)
+        assert iface.get_signing_serializer(app) is first
+        init_config(ConfigManager(str(tmp_path / "data_sk4")))
+        assert iface.get_signing_serializer(app) is not first
+
+    def test_session_cookie_samesite(self, client, tmp_path):
+        mgr = ConfigManager(str(tmp_path / "data_sk5"))
+        mgr.save({"modem_password": "test", "admin_password": "pw"})
+        init_config(mgr)
+        resp = client.post("/login", data={"password": "pw"})
+        assert "SameSite=Lax" in resp.headers["Set-Cookie"]
+
+
+class TestTemplateBytecodeCache:
+    def test_cache_dir_under_data_dir(self, tmp_path):
+        cache_dir = tmp_path / "data_tc" / ".jinja_cache"
+        init_config(ConfigManager(str(cache_dir.parent)))
+        assert cache_dir.is_dir()
+        assert app.jinja_env.bytecode_cache.directory == str(cache_dir)
+
+
+class TestState:
+    def test_update_swaps_snapshot(self, sample_analysis):
+        before = web_module._state
+        update_state(analysis=sample_analysis, poll_interval=300)
+        after = web_module._state
+        assert after is not before
+        assert after.analysis is sample_analysis
+        assert after.poll_interval == 300
+        assert after.error is None
+
+    def test_state_is_immutable(self):
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            web_module._state.error = "boom"
+
 
 class TestPollEndpoint:
-    def test_poll_not_configured(self, tmp_path):
-        from app.web import _state
-        mgr = ConfigManager(str(tmp_path / "data_poll"))
-        init_config(mgr)
-        app.config["TESTING"] = True
-        with app.test_client() as c:
-            resp = c.post("/api/poll")
-            # Unconfigured -> redirects to setup on GET, but POST /api/poll
-            # should still be accessible (no auth required when no password)
-            assert resp.status_code in (302, 500)
-
-    def test_poll_rate_limit(self, client, sample_analysis):
-        import app.web as web_module
-        web_module._last_manual_poll = __import__('time').time()
+    def test_poll_not_configured(self, unconfigured_client, monkeypatch):
+        def no_modem(*args, **kwargs):
+            raise ConnectionError("no modem in tests")
+
+        monkeypatch.setattr("app.fritzbox.login", no_modem)
+        resp = unconfigured_client.post("/api/poll")
+        # Unconfigured -> redirects to setup on GET, but POST /api/poll
+        # should still be accessible (no auth required when no password)
+        assert resp.status_code in (302, 500)
+
+    def test_poll_rate_limit(self, client):
+        web_module._last_manual_poll = time.time()
         resp = client.post("/api/poll")
         assert resp.status_code == 429
-        data = json.loads(resp.data)
+        data = resp.get_json()
         assert data["success"] is False
-        # Reset for other tests
-        web_module._last_manual_poll = 0.0
 
 
 class TestFormatK:
-    def test_large_number(self):
-        from app.web import format_k
-        assert format_k(132007) == "132k"
-
-    def test_medium_number(self):
-        from app.web import format_k
-        assert format_k(5929) == "5.9k"
-
-    def test_round_thousand(self):
-        from app.web import format_k
-        assert format_k(3000) == "3k"
-
-    def test_small_number(self):
-        from app.web import format_k
-        assert format_k(42) == "42"
-
-    def test_invalid(self):
-        from app.web import format_k
-        assert format_k("bad") == "bad"
+    @pytest.mark.parametrize("value,expected", [
+        (132007, "132k"),
+        (5929, "5.9k"),
+        (3000, "3k"),
+        (42, "42"),
+        ("bad", "bad"),
+        # Bounds of the precomputed small-int table
+        (0, "0"),
+        (999, "999"),
+        (1000, "1k"),
+        (-5, "-5"),
+        ("42", "42"),
+    ])
+    def test_format(self, value, expected):
+        assert format_k(value) == expected